@@ -5,10 +5,7 @@ Es zeigt das Szenario-Auswahlverfahren und die Instruktionen an, bevor automatis
 auf die einzelnen Seiten (Anamnese, Untersuchung, Diagnostik usw.) verzweigt wird.
 """
 
-import os
-
 import streamlit as st
-from openai import OpenAI
 
 # Externe Helfermodule, die für die Fallvorbereitung und das Startlayout benötigt werden.
 from module.sidebar import show_sidebar
@@ -17,20 +14,23 @@ from module.offline import display_offline_banner
 from module.fallverwaltung import (
     fallauswahl_prompt,
     lade_fallbeispiele,
+    lade_szenario_namen,
     prepare_fall_session_state,
 )
 from module.fall_config import clear_fixed_scenario, get_fall_fix_state
 from module.feedback_mode import determine_feedback_mode
 from module.footer import copyright_footer
+from module.openai_client import get_openai_client
 
 # ---------------------------------------------------------------------------
 # Initialisierung
 # ---------------------------------------------------------------------------
 
-# Einmaliger Aufbau des OpenAI-Clients. Die nachfolgenden Seiten greifen über den
-# Session-State darauf zu, weshalb wir die Instanz hier zentral ablegen.
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-st.session_state["openai_client"] = client
+# Der OpenAI-Client wird über ``st.cache_resource`` nur einmal pro Prozess erzeugt
+# (siehe ``module/openai_client.py``). Alle Seiten rufen ``get_openai_client()`` direkt
+# auf; eine Kopie im Session-State ist nicht mehr nötig. Der Aufruf hier stellt sicher,
+# dass der Client bereits beim ersten Seitenaufruf aufgebaut ist.
+get_openai_client()
 
 
 def initialisiere_session_state() -> None:
@@ -43,6 +43,11 @@ def initialisiere_session_state() -> None:
     st.session_state.setdefault("final_diagnose", "")
     st.session_state.setdefault("offline_mode", False)
     st.session_state.setdefault("fall_vorbereitung_abgeschlossen", False)
+    # Zähler und Verlauf der Studierendenfragen werden beim Absenden im Chat
+    # fortgeschrieben, damit Seitenleiste und Feedback nicht bei jedem Rerun den
+    # gesamten Nachrichtenverlauf durchsuchen müssen.
+    st.session_state.setdefault("user_msg_count", 0)
+    st.session_state.setdefault("user_verlauf_parts", [])
 
 
 initialisiere_session_state()
@@ -66,11 +71,10 @@ def fuehre_fall_vorbereitung_durch() -> None:
 
     # Die Falldaten werden erst geladen, sobald die Instruktionen angezeigt
     # werden. Dadurch bleibt der erste Eindruck aufgeräumt und es entsteht kein
-    # fühlbarer Verzug zwischen Hinweistext und Ladeindikator.
-    szenario_df = st.session_state.get("fallliste_df")
-    if szenario_df is None:
-        szenario_df = lade_fallbeispiele()
-        st.session_state["fallliste_df"] = szenario_df
+    # fühlbarer Verzug zwischen Hinweistext und Ladeindikator. Die Tabelle liegt
+    # prozessweit im ``st.cache_data``-Cache, sodass nur der erste Sitzungsstart
+    # pro Stunde tatsächlich Supabase abfragt.
+    szenario_df = lade_fallbeispiele()
 
     if szenario_df.empty:
         st.error(
@@ -85,14 +89,7 @@ def fuehre_fall_vorbereitung_durch() -> None:
     if admin_szenario:
         fallauswahl_prompt(szenario_df, admin_szenario)
     elif fixed and fixed_szenario:
-        if "Szenario" in szenario_df.columns:
-            verfuegbare_szenarien = {
-                str(s).strip() for s in szenario_df["Szenario"].dropna() if str(s).strip()
-            }
-        else:
-            verfuegbare_szenarien = set()
-
-        if fixed_szenario in verfuegbare_szenarien:
+        if fixed_szenario in lade_szenario_namen():
             fallauswahl_prompt(szenario_df, fixed_szenario)
         else:
             st.warning(
@@ -1,16 +1,13 @@
-from module.token_counter import init_token_counters, add_usage
+from module.llm_cache import cached_chat_completion
+from module.llm_config import BEREICH_BEFUND, get_model
 from module.patient_language import get_patient_forms
 from module.offline import get_offline_befund, is_offline
 
-def generiere_befund(client, szenario, neue_diagnostik):
-    if is_offline():
-        return get_offline_befund(neue_diagnostik)
-
-    patient_forms = get_patient_forms()
-
-    prompt = f"""{patient_forms.phrase("nom", capitalize=True)} hat laut Szenario: {szenario}.
-Folgende zusätzliche Diagnostik wurde angefordert:
-{neue_diagnostik}
+# Fester Anweisungsteil für alle Befundanforderungen. Er enthält bewusst keine
+# fall- oder zeitabhängigen Angaben (Szenario, Datum, Zufallswerte), damit jede
+# Anfrage mit exakt denselben Bytes beginnt und der Präfix-Cache von OpenAI greifen
+# kann. Fallbezogene Angaben folgen erst in der Nutzernachricht.
+SYSTEM_PROMPT_TEMPLATE = """Du erstellst Befunde zu angeforderter Diagnostik für eine medizinische Lernsimulation.
 
 Erstelle ausschließlich Befunde zu den genannten Untersuchungen.
 
@@ -18,20 +15,42 @@ Falls **Laborwerte** angefordert wurden, gib sie bitte **nur in folgender Tabell
 
 **Parameter** | **Wert** | **Referenzbereich (SI-Einheit)**
 
-🔒 Verwende **ausschließlich SI-Einheiten** (z. B. mmol/l, µmol/l, Gpt/l, g/L, U/l). Werte in mg/dL oder µg/mL sind **nicht erlaubt**.
+🔒 Verwende **ausschließlich SI-Einheiten** (z. B. mmol/l, µmol/l, Gpt/l, g/L, U/l). Werte in mg/dL oder µg/mL sind **nicht erlaubt**.
 
 📌 Nutze niemals Einheiten wie mg/dL, ng/mL, µg/L oder % – ersetze diese durch SI-konforme Angaben.  
 
 Gib die Befunde **strukturiert, sachlich und ohne Interpretation** wieder. Nenne **nicht das Diagnose-Szenario**. Ergänze keine nicht angeforderten Untersuchungen."""
-    init_token_counters()
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.4
+
+# Variabler Teil der Anfrage; wird per ``str.format_map`` befüllt. Die Formulierung für
+# den Patienten stammt aus ``get_patient_forms`` (je Geschlecht einmalig aufgebaut).
+USER_PROMPT_TEMPLATE = """{patient} hat laut Szenario: {szenario}.
+Folgende zusätzliche Diagnostik wurde angefordert:
+{diagnostik}"""
+
+
+def generiere_befund(client, szenario, neue_diagnostik):
+    if is_offline():
+        return get_offline_befund(neue_diagnostik)
+
+    patient_forms = get_patient_forms()
+
+    nutzer_prompt = USER_PROMPT_TEMPLATE.format_map(
+        {
+            "patient": patient_forms.phrase("nom", capitalize=True),
+            "szenario": szenario,
+            "diagnostik": neue_diagnostik,
+        }
     )
-    add_usage(
-        prompt_tokens=response.usage.prompt_tokens,
-        completion_tokens=response.usage.completion_tokens,
-        total_tokens=response.usage.total_tokens
+    # Identische Anforderungen zum selben Szenario werden aus dem Antwort-Cache
+    # bedient (siehe ``module/llm_cache.py``); nur bei einem Fehltreffer fällt ein
+    # GPT-Aufruf inklusive Tokenerfassung an.
+    return cached_chat_completion(
+        client,
+        bereich="befund",
+        model=get_model(BEREICH_BEFUND),
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT_TEMPLATE},
+            {"role": "user", "content": nutzer_prompt},
+        ],
+        temperature=0.4,
     )
-    return response.choices[0].message.content.strip()
@@ -8,27 +8,71 @@ from befundmodul import generiere_befund
 from module.offline import is_offline
 from module.loading_indicator import task_spinner
 
+def folgebefunde() -> list:
+    """Liefert die Befunde der Folgetermine als Liste (Index 0 = Termin 2).
+
+    Die Anzeige musste bisher bei jedem Rerun alle ``befunde_runde_<n>``-Schlüssel
+    einzeln zusammensetzen und nachschlagen. ``befunde_runden`` wird beim Speichern
+    eines Termins fortgeschrieben und kann direkt durchlaufen werden. Fehlt die Liste
+    (z. B. bei einem SessionState aus einer älteren Version), wird sie einmalig aus den
+    vorhandenen Schlüsseln nachgebaut.
+    """
+
+    befunde = st.session_state.get("befunde_runden")
+    if befunde is None:
+        gesamt = st.session_state.get("diagnostik_runden_gesamt", 1)
+        befunde = [
+            st.session_state.get(f"befunde_runde_{termin}", "")
+            for termin in range(2, gesamt + 1)
+        ]
+        st.session_state["befunde_runden"] = befunde
+    return befunde
+
+
+def speichere_folgebefund(termin: int, befund: str) -> None:
+    """Legt den Befund eines Folgetermins (ab Termin 2) im SessionState ab.
+
+    Der Einzelschlüssel ``befunde_runde_<termin>`` bleibt für die bestehende
+    Rundenerkennung erhalten; die Liste ``befunde_runden`` wird gleich mit
+    aktualisiert. Den kumulativen Befundtext erstellt anschließend
+    ``aktualisiere_diagnostik_zusammenfassung``.
+    """
+
+    st.session_state[f"befunde_runde_{termin}"] = befund
+    befunde = folgebefunde()
+    while len(befunde) < termin - 1:
+        befunde.append("")
+    befunde[termin - 2] = befund
+
+
 def aktualisiere_diagnostik_zusammenfassung(start_runde=2):
     """Erstellt die kumulative Zusammenfassung aller Diagnostik- und Befund-Runden und speichert sie im SessionState."""
-    diagnostik_eingaben = ""
-    gpt_befunde = ""
-
-# Termin 1: Basisdiagnostik
-    erster_diag = st.session_state.get("user_diagnostics", "")
-    erster_befund = st.session_state.get("befunde", "")
-    
-    if erster_diag or erster_befund:
-        diagnostik_eingaben += f"\n---\n### Termin 1\n{erster_diag}\n"
-        gpt_befunde += f"\n---\n### Termin 1\n{erster_befund}\n"
-        
-    # Jetzt die restlichen Runden (ab Runde 2)
-    for i in range(2, st.session_state.get("diagnostik_runden_gesamt", start_runde - 1) + 1):
-        diag = st.session_state.get(f"diagnostik_runde_{i}", "")
-        bef = st.session_state.get(f"befunde_runde_{i}", "")
-        if diag:
-            diagnostik_eingaben += f"\n---\n### Termin {i}\n{diag}\n"
-        if bef:
-            gpt_befunde += f"\n---\n### Termin {i}\n{bef}\n"
+    # Die Abschnitte werden in Listen gesammelt und erst am Ende einmalig verbunden;
+    # wiederholtes ``+=`` hätte den bisherigen Text pro Termin erneut kopiert.
+    diagnostik_teile = []
+    befund_teile = []
+
+    # Alle Termine werden in einer gemeinsamen Schleife durchlaufen: Termin 1 liegt unter
+    # ``user_diagnostics``/``befunde``, die Folgetermine unter ``diagnostik_runde_<n>``
+    # bzw. in der Liste ``befunde_runden`` (siehe ``folgebefunde``).
+    letzte_runde = st.session_state.get("diagnostik_runden_gesamt", start_runde - 1)
+    befunde = folgebefunde()
+    termine = [(1, st.session_state.get("user_diagnostics", ""), st.session_state.get("befunde", ""))]
+    termine.extend(
+        (i, st.session_state.get(f"diagnostik_runde_{i}", ""), befunde[i - 2] if i - 2 < len(befunde) else "")
+        for i in range(2, letzte_runde + 1)
+    )
+    for termin, diag, bef in termine:
+        # Termin 1 (Basisdiagnostik) erscheint in beiden Texten, sobald einer der beiden
+        # Einträge vorliegt; Folgetermine nur dort, wo tatsächlich Inhalt vorhanden ist.
+        basis_vorhanden = termin == 1 and bool(diag or bef)
+        if diag or basis_vorhanden:
+            diagnostik_teile.append(f"\n---\n### Termin {termin}\n{diag}\n")
+        if bef or basis_vorhanden:
+            befund_teile.append(f"\n---\n### Termin {termin}\n{bef}\n")
+
+    diagnostik_eingaben = "".join(diagnostik_teile)
+    gpt_befunde = "".join(befund_teile)
 
     # Der unveränderte Text dient als Basis für spätere Kombinationen mit
     # gesondert angeforderten Untersuchungen und kann bei Bedarf separat
@@ -61,13 +105,11 @@ def aktualisiere_diagnostik_zusammenfassung(start_runde=2):
 
 def diagnostik_und_befunde_routine(client: OpenAI, start_runde=2, weitere_diagnostik_aktiv=False):
 
-    # Ermittle höchste vorhandene Befund-Runde
-    vorhandene_runden = [
-        int(k.split("_")[-1])
-        for k in st.session_state.keys()
-        if k.startswith("befunde_runde_") and k.split("_")[-1].isdigit()
-    ]
-    max_befund_runde = max(vorhandene_runden, default=start_runde - 1)
+    # Ermittle höchste vorhandene Befund-Runde. Die Folgebefunde liegen als Liste vor
+    # (Index 0 = Termin 2, siehe ``folgebefunde``); statt bei jedem Rerun alle Schlüssel
+    # des SessionState zu durchsuchen, genügt deren Länge.
+    letzte_befund_runde = len(folgebefunde()) + 1
+    max_befund_runde = max(letzte_befund_runde, start_runde - 1)
 
     # Wenn neue Diagnostik aktiviert wurde, nächste Runde erlauben
     if st.session_state.get("diagnostik_aktiv", False):
@@ -83,7 +125,7 @@ def diagnostik_und_befunde_routine(client: OpenAI, start_runde=2, weitere_diagno
         # 📝 Eingabeformular nur, wenn explizit aktiviert
         if (
             not befund_existiert
-            and runde not in vorhandene_runden
+            and runde > letzte_befund_runde
             and st.session_state.get("diagnostik_aktiv", False)
             and weitere_diagnostik_aktiv  # <-- neue Kontrolle, amit macht das Modul nur dann neue Formulare, wenn es explizit zulässt.
         ):
@@ -99,7 +141,7 @@ def diagnostik_und_befunde_routine(client: OpenAI, start_runde=2, weitere_diagno
 
                 if is_offline():
                     befund = generiere_befund(client, szenario, neue_diagnostik)
-                    st.session_state[befund_key] = befund
+                    speichere_folgebefund(runde, befund)
                 else:
                     ladeaufgaben = [
                         "Übermittle neue Diagnostik",
@@ -110,7 +152,7 @@ def diagnostik_und_befunde_routine(client: OpenAI, start_runde=2, weitere_diagno
                         indikator.advance(1)
                         befund = generiere_befund(client, szenario, neue_diagnostik)
                         indikator.advance(1)
-                        st.session_state[befund_key] = befund
+                        speichere_folgebefund(runde, befund)
                         indikator.advance(1)
 
                 st.session_state["diagnostik_runden_gesamt"] = runde
@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import json
+import os
 from typing import Any
 
 import streamlit as st
 
-from module.token_counter import init_token_counters, add_usage
+from module.llm_cache import cached_chat_completion, stream_chat_completion
+from module.llm_config import BEREICH_FEEDBACK, BEREICH_FEEDBACK_AMBOSS, get_model
 from module.patient_language import get_patient_forms
 from module.offline import get_offline_feedback, is_offline
 from module.feedback_mode import (
@@ -21,6 +23,13 @@ _MIN_AMBOSS_SUMMARY_CHARS = 200
 # Maximale Länge eines Debug-Auszugs aus dem Roh-Payload, damit der Prompt klein bleibt.
 _MAX_AMBOSS_RAW_SNIPPET = 2000
 
+# Obergrenze pro umfangreichem Freitextfeld im Feedback-Prompt (Gesprächsverlauf,
+# Befunde, Diagnostik). 12.000 Zeichen entsprechen bei deutschem Text grob 3.000
+# Tokens. Nur sehr lange Sitzungen erreichen diese Grenze; dann bleiben Anfang und
+# Ende erhalten, weil dort Einstieg und abschließende Entscheidungen stehen.
+_MAX_FELD_ZEICHEN = 12000
+_KUERZUNGS_MARKE = "\n\n[… gekürzt …]\n\n"
+
 
 def _build_amboss_context() -> str:
     """Gibt den AMBOSS-Kontext für den Feedback-Prompt zurück."""
@@ -65,53 +74,39 @@ def _build_amboss_context() -> str:
     )
 
 
-def feedback_erzeugen(
-    client,
-    final_diagnose,
-    therapie_vorschlag,
-    user_ddx2,
-    diagnostik_eingaben,
-    gpt_befunde,
-    koerper_befund,
-    user_verlauf,
-    anzahl_termine,
-    diagnose_szenario,
-):
-    """Generiert das Abschlussfeedback anhand eines einzigen konsistenten Prompts."""
+# Fester Anweisungsteil (Rolle, Bewertungsraster, ökologische und ökonomische
+# Aspekte). Er enthält bewusst keine fallbezogenen Angaben, damit jede Feedback-Anfrage
+# mit exakt denselben Bytes beginnt und der Präfix-Cache von OpenAI greifen kann (vgl.
+# ``SYSTEM_PROMPT_TEMPLATE`` in ``befundmodul.py``). Die Falldaten folgen erst in der
+# Nutzernachricht.
+FEEDBACK_SYSTEM_PROMPT = """Du bist ein erfahrener medizinischer Prüfer. Du erhältst die Daten einer vollständigen virtuellen Fallbesprechung, die ein Medizinstudierender durchgeführt hat.
 
-    # Der Modus entscheidet, ob zusätzlich AMBOSS-Ergebnisse in die Bewertung
-    # einbezogen werden dürfen. Bei Bedarf kann hier zur Fehlersuche der Modus
-    # geloggt werden.
-    feedback_mode = determine_feedback_mode()
+Beurteile ausschließlich die Eingaben und Entscheidungen des Studierenden – NICHT die Antworten der simulierten Patientenperson oder automatisch generierte Inhalte. GPT-generierte Befunde dienen nur als Hintergrund und werden nicht bewertet.
 
-    # Im Offline-Modus wird eine vorbereitete Rückfallantwort genutzt. Weitere
-    # Fallbacks sind bewusst nicht vorhanden, um das Verhalten transparent zu
-    # halten.
-    if is_offline():
-        return get_offline_feedback(diagnose_szenario)
+Strukturiere dein Feedback klar, hilfreich und differenziert – wie ein persönlicher Kommentar bei einer mündlichen Prüfung, schreibe in der zweiten Person.
 
-    patient_forms = get_patient_forms()
+Nenne vorab das zugrunde liegende Szenario. Gib an, ob die Diagnose richtig gestellt wurde. Gib an, wieviele Termine für die Diagnostik benötigt wurden.
 
-    # Tokenzähler initialisieren, damit sowohl der Prompt als auch die Antwort
-    # konsistent dokumentiert werden. Für Debugging lässt sich hier ein
-    # zusätzlicher Logeintrag ergänzen.
-    init_token_counters()
+1. Wurden im Gespräch alle relevanten anamnestischen Informationen erhoben?
+2. War die gewählte Diagnostik nachvollziehbar, vollständig und passend zur Szenariodiagnose?
+3. War die gewählte Diagnostik nachvollziehbar, vollständig und passend zu den vom Studierenden erhobenen Differentialdiagnosen?
+4. Beurteile, ob die diagnostische Strategie sinnvoll aufgebaut war, beachte dabei die Zahl der notwendigen Untersuchungstermine. Gab es unnötige Doppeluntersuchungen, sinnvolle Eskalation, fehlende Folgeuntersuchungen? Beziehe dich ausdrücklich auf die Reihenfolge und den Inhalt der Runden.
+5. Ist die finale Diagnose nachvollziehbar, insbesondere im Hinblick auf Differenzierung zu anderen Möglichkeiten?
+6. Ist das Therapiekonzept leitliniengerecht, plausibel und auf die Diagnose abgestimmt?
 
-    # Optionaler AMBOSS-Kontext wird nur im entsprechenden Modus geladen.
-    amboss_context = ""
-    if feedback_mode == FEEDBACK_MODE_AMBOSS_CHATGPT:
-        # Die hier genutzte Zusammenfassung wurde im Vorfeld erzeugt und hält den
-        # Prompt bewusst klein. Debug-Hinweise dazu finden sich in
-        # `_build_amboss_context`.
-        amboss_context = _build_amboss_context()
+**Berücksichtige und kommentiere zusätzlich**:
+- ökologische Aspekte (z. B. überflüssige Diagnostik, zuviele Anforderungen, zuviele Termine, CO₂-Bilanz, Strahlenbelastung bei CT oder Röntgen, Ressourcenverbrauch).
+- ökonomische Sinnhaftigkeit (Kosten-Nutzen-Verhältnis)
+- Beachte und begründe auch, warum zuwenig Diagnostik unwirtschaftlich und nicht nachhaltig sein kann.
 
-    # Der Prompt wird komplett in einem String aufgebaut, sodass das Modell das
-    # Feedback in einem Schritt erzeugt. Dadurch vermeiden wir divergierende
-    # Teilantworten und gewährleisten eine konsistente Tonalität.
-    prompt = f"""
-Ein Medizinstudierender hat eine vollständige virtuelle Fallbesprechung mit {patient_forms.phrase("dat", article="indefinite")} durchgeführt. Du bist ein erfahrener medizinischer Prüfer.
+Falls zusätzliche Fachinformationen (AMBOSS) mitgeliefert werden, nutze sie als fachliche Referenz für deine Bewertung."""
 
-Beurteile ausschließlich die Eingaben und Entscheidungen des Studierenden – NICHT die Antworten {patient_forms.phrase("gen")} oder automatisch generierte Inhalte.
+# Die Systemnachricht wird einmalig angelegt und in jeder Anfrage wiederverwendet. Sie
+# darf nicht verändert werden, da alle Feedback-Anfragen dasselbe Objekt teilen.
+_FEEDBACK_SYSTEM_NACHRICHT = {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT}
+
+# Variabler Teil mit den Falldaten; wird per ``str.format_map`` befüllt.
+FEEDBACK_USER_TEMPLATE = """Ein Medizinstudierender hat eine vollständige virtuelle Fallbesprechung mit {patient_dat} durchgeführt. Bewerte nicht die Antworten {patient_gen}.
 
 Die zugrunde liegende Erkrankung im Szenario lautet: **{diagnose_szenario}**.
 
@@ -134,48 +129,224 @@ Finale Diagnose (Nutzereingabe):
 Therapiekonzept (Nutzereingabe):
 {therapie_vorschlag}
 
-Die Fallbearbeitung umfasste {anzahl_termine} Diagnostik-Termine.
+Die Fallbearbeitung umfasste {anzahl_termine} Diagnostik-Termine."""
+
+
+# Optionaler JSON-Modus (``KARINA_FEEDBACK_JSON=1``): GPT liefert das Feedback als
+# JSON-Objekt ohne Überschriften, Überleitungen und wiederholte Fragetexte, was
+# Ausgabe-Tokens spart. Die App setzt daraus wieder Markdown zusammen, sodass Anzeige,
+# Download und Supabase unverändert bleiben. Standardmäßig aus, weil die Antwort dann
+# nicht gestreamt werden kann.
+_FEEDBACK_JSON_ABSCHNITTE = (
+    ("aspekt_1", "Anamnese"),
+    ("aspekt_2", "Diagnostik und Szenariodiagnose"),
+    ("aspekt_3", "Diagnostik und Differentialdiagnosen"),
+    ("aspekt_4", "Diagnostische Strategie"),
+    ("aspekt_5", "Finale Diagnose"),
+    ("aspekt_6", "Therapiekonzept"),
+    ("oekologie", "Ökologische Aspekte"),
+    ("oekonomie", "Ökonomische Aspekte"),
+)
 
-Strukturiere dein Feedback klar, hilfreich und differenziert – wie ein persönlicher Kommentar bei einer mündlichen Prüfung, schreibe in der zweiten Person.
+_FEEDBACK_JSON_ANWEISUNG = (
+    "\n\nAntworte ausschließlich als JSON-Objekt ohne Vorbemerkung mit den Schlüsseln "
+    '"szenario" (Text), "diagnose_richtig" (true/false), "termine" (Zahl) sowie '
+    + ", ".join(f'"{schluessel}"' for schluessel, _ in _FEEDBACK_JSON_ABSCHNITTE)
+    + " (jeweils dein Kommentar als Text zu Punkt 1–6 bzw. zu den zusätzlichen Aspekten)."
+)
 
-Nenne vorab das zugrunde liegende Szenario. Gib an, ob die Diagnose richtig gestellt wurde. Gib an, wieviele Termine für die Diagnostik benötigt wurden.
 
-1. Wurden im Gespräch alle relevanten anamnestischen Informationen erhoben?
-2. War die gewählte Diagnostik nachvollziehbar, vollständig und passend zur Szenariodiagnose **{diagnose_szenario}**?
-3. War die gewählte Diagnostik nachvollziehbar, vollständig und passend zu den Differentialdiagnosen **{user_ddx2}**?
-4. Beurteile, ob die diagnostische Strategie sinnvoll aufgebaut war, beachte dabei die Zahl der notwendigen Untersuchungstermine. Gab es unnötige Doppeluntersuchungen, sinnvolle Eskalation, fehlende Folgeuntersuchungen? Beziehe dich ausdrücklich auf die Reihenfolge und den Inhalt der Runden.
-5. Ist die finale Diagnose nachvollziehbar, insbesondere im Hinblick auf Differenzierung zu anderen Möglichkeiten?
-6. Ist das Therapiekonzept leitliniengerecht, plausibel und auf die Diagnose abgestimmt?
+def feedback_json_modus_aktiv() -> bool:
+    """Prüft, ob das Feedback im JSON-Modus angefordert werden soll."""
 
-**Berücksichtige und kommentiere zusätzlich**:
-- ökologische Aspekte (z. B. überflüssige Diagnostik, zuviele Anforderungen, zuviele Termine, CO₂-Bilanz, Strahlenbelastung bei CT oder Röntgen, Ressourcenverbrauch).
-- ökonomische Sinnhaftigkeit (Kosten-Nutzen-Verhältnis)
-- Beachte und begründe auch, warum zuwenig Diagnostik unwirtschaftlich und nicht nachhaltig sein kann.
-"""
+    return os.getenv("KARINA_FEEDBACK_JSON", "0").strip().lower() in {"1", "true", "on", "ja"}
+
+
+def formatiere_feedback_json(rohtext: str) -> str:
+    """Setzt eine JSON-Antwort wieder zu lesbarem Markdown-Feedback zusammen.
+
+    Ist die Antwort kein gültiges JSON-Objekt, wird der Rohtext unverändert
+    zurückgegeben, damit das Feedback nie verloren geht. Debug-Hinweis: Die
+    Rohantwort lässt sich vor dem Aufruf mit ``st.code(rohtext)`` anzeigen.
+    """
+
+    try:
+        daten = json.loads(rohtext)
+    except (TypeError, ValueError):
+        return rohtext
+    if not isinstance(daten, dict):
+        return rohtext
+
+    teile: list[str] = []
+    if daten.get("szenario"):
+        teile.append(f"**Szenario:** {daten['szenario']}")
+    if isinstance(daten.get("diagnose_richtig"), bool):
+        teile.append(f"**Diagnose richtig gestellt:** {'Ja' if daten['diagnose_richtig'] else 'Nein'}")
+    if daten.get("termine") not in (None, ""):
+        teile.append(f"**Diagnostik-Termine:** {daten['termine']}")
+    for schluessel, titel in _FEEDBACK_JSON_ABSCHNITTE:
+        inhalt = daten.get(schluessel)
+        if inhalt:
+            teile.append(f"#### {titel}\n{inhalt}")
+    return "\n\n".join(teile) if teile else rohtext
+
+
+def _begrenze_feld(text, maximal: int = _MAX_FELD_ZEICHEN) -> str:
+    """Kürzt sehr lange Felder auf Anfang und Ende, damit der Prompt begrenzt bleibt.
+
+    Gezählt wird in Zeichen statt Tokens; ein Tokenizer (``tiktoken``) ist keine
+    Abhängigkeit der App, und für eine Obergrenze genügt die Schätzung.
+    """
+
+    text = str(text or "")
+    if len(text) <= maximal:
+        return text
+    haelfte = maximal // 2
+    return f"{text[:haelfte]}{_KUERZUNGS_MARKE}{text[-haelfte:]}"
+
+
+def feedback_modell() -> str:
+    """Liefert das Modell für das Abschlussfeedback im aktuell aktiven Modus.
+
+    Im AMBOSS-Modus kann über ``feedback_amboss_model`` (Secrets) bzw.
+    ``KARINA_FEEDBACK_AMBOSS_MODEL`` ein eigenes Modell gesetzt werden, sonst gilt
+    dasselbe Modell wie für das reguläre Feedback.
+    """
+
+    if determine_feedback_mode() == FEEDBACK_MODE_AMBOSS_CHATGPT:
+        return get_model(BEREICH_FEEDBACK_AMBOSS)
+    return get_model(BEREICH_FEEDBACK)
+
+
+def baue_feedback_nachrichten(
+    final_diagnose,
+    therapie_vorschlag,
+    user_ddx2,
+    diagnostik_eingaben,
+    gpt_befunde,
+    koerper_befund,
+    user_verlauf,
+    anzahl_termine,
+    diagnose_szenario,
+    json_modus: bool = False,
+):
+    """Stellt die Nachrichtenliste für das Abschlussfeedback zusammen.
+
+    Wird sowohl vom synchronen Aufruf (``feedback_erzeugen``) als auch vom
+    Batch-Modus (``module/feedback_batch.py``) genutzt, damit beide Wege exakt
+    denselben Prompt verwenden. Die Systemnachricht ist für alle Fälle identisch,
+    die Nutzernachricht enthält nur die Falldaten. Mit ``json_modus`` wird die
+    Antwortvorgabe für den JSON-Modus an die Nutzernachricht angehängt.
+    """
+
+    feedback_mode = determine_feedback_mode()
+    patient_forms = get_patient_forms()
+
+    # Optionaler AMBOSS-Kontext wird nur im entsprechenden Modus geladen.
+    amboss_context = ""
+    if feedback_mode == FEEDBACK_MODE_AMBOSS_CHATGPT:
+        # Die hier genutzte Zusammenfassung wurde im Vorfeld erzeugt und hält den
+        # Prompt bewusst klein. Debug-Hinweise dazu finden sich in
+        # `_build_amboss_context`.
+        amboss_context = _build_amboss_context()
+
+    # Das Feedback entsteht weiterhin in einem einzigen Aufruf. Dadurch vermeiden wir
+    # divergierende Teilantworten und gewährleisten eine konsistente Tonalität.
+    nutzer_prompt = FEEDBACK_USER_TEMPLATE.format_map(
+        {
+            "patient_dat": patient_forms.phrase("dat", article="indefinite"),
+            "patient_gen": patient_forms.phrase("gen"),
+            "diagnose_szenario": diagnose_szenario,
+            "user_verlauf": _begrenze_feld(user_verlauf),
+            "koerper_befund": _begrenze_feld(koerper_befund),
+            "gpt_befunde": _begrenze_feld(gpt_befunde),
+            "user_ddx2": user_ddx2,
+            "diagnostik_eingaben": _begrenze_feld(diagnostik_eingaben),
+            "final_diagnose": final_diagnose,
+            "therapie_vorschlag": therapie_vorschlag,
+            "anzahl_termine": anzahl_termine,
+        }
+    )
 
     if amboss_context:
-        prompt += f"""
+        # Der AMBOSS-Block wird angehängt, ohne den Falltext per ``+=`` zu kopieren.
+        nutzer_prompt = "".join(
+            (nutzer_prompt, "\n\nZusätzliche Fachinformationen (AMBOSS):\n", amboss_context, "\n")
+        )
+
+    if json_modus:
+        nutzer_prompt = "".join((nutzer_prompt, _FEEDBACK_JSON_ANWEISUNG))
+
+    return [_FEEDBACK_SYSTEM_NACHRICHT, {"role": "user", "content": nutzer_prompt}]
+
+
+def feedback_erzeugen(
+    client,
+    final_diagnose,
+    therapie_vorschlag,
+    user_ddx2,
+    diagnostik_eingaben,
+    gpt_befunde,
+    koerper_befund,
+    user_verlauf,
+    anzahl_termine,
+    diagnose_szenario,
+):
+    """Generiert das Abschlussfeedback anhand eines einzigen konsistenten Prompts."""
 
-Zusätzliche Fachinformationen (AMBOSS):
-{amboss_context}
-"""
+    # Im Offline-Modus wird sofort eine vorbereitete Rückfallantwort genutzt, noch
+    # bevor Feedback-Modus, Patientenformen oder Prompt ermittelt werden. Weitere
+    # Fallbacks sind bewusst nicht vorhanden, um das Verhalten transparent zu
+    # halten.
+    if is_offline():
+        return get_offline_feedback(diagnose_szenario)
 
     # Der Aufruf erfolgt bewusst sequentiell mit einem einzelnen Prompt. Bei
     # Fehlermeldungen kann der Prompt-Inhalt beispielsweise über `st.write` zur
-    # Analyse ausgegeben werden.
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
+    # Analyse ausgegeben werden. Wiederholte Anfragen mit identischen Eingaben
+    # (z. B. nach einem Neuladen der Seite) werden aus dem Antwort-Cache bedient,
+    # siehe ``module/llm_cache.py``. Der Tokenverbrauch wird dort nur bei echten
+    # API-Aufrufen erfasst.
+    json_modus = feedback_json_modus_aktiv()
+    api_optionen = {"response_format": {"type": "json_object"}} if json_modus else {}
+    antwort = cached_chat_completion(
+        client,
+        bereich="feedback",
+        model=feedback_modell(),
+        messages=baue_feedback_nachrichten(
+            final_diagnose,
+            therapie_vorschlag,
+            user_ddx2,
+            diagnostik_eingaben,
+            gpt_befunde,
+            koerper_befund,
+            user_verlauf,
+            anzahl_termine,
+            diagnose_szenario,
+            json_modus=json_modus,
+        ),
         temperature=0.4,
+        **api_optionen,
     )
-
-    # Tokenverbrauch erfassen, um die Nutzung nachvollziehen zu können. Für
-    # Debugging kann bei Bedarf zusätzlich `response` inspiziert werden.
-    add_usage(
-        prompt_tokens=response.usage.prompt_tokens,
-        completion_tokens=response.usage.completion_tokens,
-        total_tokens=response.usage.total_tokens,
+    return formatiere_feedback_json(antwort) if json_modus else antwort
+
+
+def feedback_erzeugen_stream(client, *feedback_argumente):
+    """Liefert das Abschlussfeedback als Textfragmente für ``st.write_stream``.
+
+    Nimmt dieselben Argumente wie ``feedback_erzeugen`` (ohne Schlüsselwörter) und
+    nutzt denselben Prompt, dasselbe Modell und denselben Antwort-Cache. Statt eines
+    Spinners über 10–30 Sekunden erscheinen die ersten Sätze nach kurzer Zeit.
+    Nur für den Online-Modus gedacht; offline liefert ``feedback_erzeugen`` die
+    vorbereitete Rückfallantwort.
+    """
+
+    # Tokenerfassung und Cache-Eintrag übernimmt ``stream_chat_completion``, sobald
+    # der Stream vollständig gelesen wurde.
+    yield from stream_chat_completion(
+        client,
+        bereich="feedback",
+        model=feedback_modell(),
+        messages=baue_feedback_nachrichten(*feedback_argumente),
+        temperature=0.4,
     )
-
-    return response.choices[0].message.content
-
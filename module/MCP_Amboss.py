@@ -20,15 +20,117 @@ zusätzliche ``st.write``-Ausgaben aktiviert werden, die aktuell aus Gründen de
 """
 
 from __future__ import annotations
-import json
-from typing import Optional, Dict, Any, Tuple
+from functools import lru_cache
+import hashlib
+import re
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple
 import time
 
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from module.json_backend import json_dumps_bytes, json_loads
 
 AMBOSS_URL: str = "https://content-mcp.de.production.amboss.com/mcp"
 
+# Header, die für jede Anfrage gleich sind. Sie werden einmalig in der geteilten
+# Session hinterlegt; pro Aufruf kommt nur noch ``Authorization`` hinzu.
+# ``Content-Type`` muss gesetzt sein, weil die Nutzlast als fertige Bytes (``data=``)
+# statt per ``json=`` übergeben wird.
+_STANDARD_HEADER: Dict[str, str] = {
+    "Accept": "application/json, text/event-stream",
+    "Content-Type": "application/json",
+}
+
+# Vollständige MCP-Antworten werden prozessweit zwischengespeichert. Dasselbe Szenario
+# wird in Lehrveranstaltungen oft von vielen Studierenden kurz nacheinander gestartet;
+# statt jedes Mal mehrere Sekunden auf AMBOSS zu warten, genügt dann ein Abruf pro
+# Stunde. Teilantworten aus abgebrochenen Streams werden nie gecacht.
+_CACHE_TTL_SEKUNDEN = 60 * 60
+_CACHE_MAX_EINTRAEGE = 256
+
+# Inhalt einer SSE-``data:``-Zeile ohne umgebende Leerzeichen (siehe ``_sse_events``).
+# Das Muster arbeitet auf Bytes: Der Stream wird erst nach dem Zusammensetzen eines
+# Events dekodiert, Kommentar- und ``event:``-Zeilen werden nie in Text umgewandelt.
+_SSE_DATA_RE = re.compile(rb"^data:[ \t]*(.*?)[ \t\r]*$", re.MULTILINE)
+
+# Strukturzeichen eines JSON-Textes für ``_recover_partial_json``: vollständige
+# Strings (inklusive Escapes) werden als ein Treffer übersprungen, damit Klammern
+# innerhalb von Texten die Tiefe nicht verfälschen.
+_JSON_STRUKTUR_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]', re.DOTALL)
+
+
+@st.cache_resource(show_spinner=False)
+def amboss_http_session() -> requests.Session:
+    """Liefert eine prozessweit geteilte HTTP-Session für den AMBOSS-MCP-Endpunkt.
+
+    Bisher baute jeder ``requests.post``-Aufruf eine neue TCP- und TLS-Verbindung auf;
+    der Handshake kostet pro Anfrage 100–300 ms zusätzlich. Die Session hält die
+    Verbindungen per Keep-alive offen und verteilt sie über einen kleinen Pool auf
+    gleichzeitige Sitzungen. Kurzzeitige Gateway-Fehler (502/503/504) werden auf
+    Transportebene bis zu zweimal wiederholt; ``search_article_sections`` liest nur
+    und darf daher auch als POST erneut gesendet werden. Der Bearer-Token wird pro
+    Anfrage übergeben und nicht in der Session abgelegt.
+    """
+
+    session = requests.Session()
+    wiederholung = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=wiederholung))
+    session.headers.update(_STANDARD_HEADER)
+    return session
+
+
+@st.cache_resource(show_spinner=False)
+def _amboss_token() -> str:
+    """Liest ``Amboss_Token`` einmal pro Prozess aus ``st.secrets``.
+
+    Fehlt der Token, wird ein ``ValueError`` ausgelöst; Streamlit cacht Ausnahmen
+    nicht, sodass ein nachgetragener Token beim nächsten Aufruf gefunden wird.
+    Debug-Hinweis: Nach einem Tokenwechsel ``_amboss_token.clear()`` aufrufen.
+    """
+
+    token = st.secrets.get("Amboss_Token")
+    if not token:
+        raise ValueError("Amboss_Token not found. Please set in st.secrets or pass as argument.")
+    return token
+
+
+@lru_cache(maxsize=8)
+def _token_hash(token: str) -> str:
+    """SHA256 des Tokens für den Cache-Schlüssel, je Token nur einmal berechnet."""
+
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _auth_header(token: str) -> Dict[str, str]:
+    """Fertiger ``Authorization``-Header je Token, einmal gebaut statt pro Aufruf.
+
+    Das Dictionary wird von allen Aufrufen geteilt und darf nicht verändert werden;
+    für Zusatz-Header legt ``call_amboss_search`` eine Kopie an.
+    """
+
+    return {"Authorization": f"Bearer {token}"}
+
+
+class _UnvollstaendigeAntwort(Exception):
+    """Reicht eine Teilantwort aus der gecachten Funktion heraus, ohne sie zu cachen.
+
+    ``st.cache_data`` speichert keine Funktionsaufrufe, die mit einer Exception enden.
+    """
+
+    def __init__(self, ergebnis: dict):
+        super().__init__("Unvollständige MCP-Antwort")
+        self.ergebnis = ergebnis
+
 
 def _build_payload(query: str, *, language: str = "de") -> Dict[str, Any]:
     """Erstellt die JSON-RPC-Nutzlast für den MCP-Endpunkt von AMBOSS."""
@@ -43,41 +145,42 @@ def _build_payload(query: str, *, language: str = "de") -> Dict[str, Any]:
     }
 
 
-def _try_parse_json(s: str) -> Optional[Any]:
+def _try_parse_json(s: str | bytes) -> Optional[Any]:
     """Hilfsfunktion, um JSON robust zu parsen und Fehler still zu ignorieren."""
     try:
-        return json.loads(s)
+        return json_loads(s)
     except Exception:
         return None
 
 
-def _looks_like_json(value: str) -> bool:
-    """Prüft anhand einfacher Heuristiken, ob ein String JSON enthalten könnte."""
-    stripped = value.strip()
-    return (stripped.startswith("{") and stripped.endswith("}")) or (
-        stripped.startswith("[") and stripped.endswith("]")
-    )
-
-
 def _recover_partial_json(fragment: str) -> Optional[Any]:
     """Versucht, aus einem abgeschnittenen JSON-Fragment einen verwertbaren Teil zu extrahieren."""
 
-    # Wir prüfen ausschließlich Fragmente, die mit ``}`` oder ``]`` enden. Nur dann
-    # besteht eine realistische Chance, dass zumindest ein Teilobjekt vollständig
-    # vorliegt. Der längste, gültige Präfix wird beibehalten, kürzere Varianten
-    # dienen als Fallback für stark fragmentierte Antworten.
+    # Ein gültiger Präfix muss ein vollständiges Objekt bzw. eine vollständige Liste
+    # ab dem ersten Zeichen sein; alles Längere enthält überzählige Daten und alles
+    # Kürzere ist noch offen. Es gibt also genau einen Kandidaten: die Stelle, an der
+    # die Klammertiefe zum ersten Mal wieder auf null fällt.
+    #
+    # Früher wurde an jeder ``}``/``]`` ein Präfix abgeschnitten und geparst, vom
+    # längsten zum kürzesten – bei einem mehrere Megabyte großen Fragment quadratischer
+    # Aufwand. Jetzt genügt ein Durchlauf über ``_JSON_STRUKTUR_RE``, der Strings samt
+    # Escapes als Ganzes überspringt, und höchstens ein Parser-Aufruf.
     stripped = fragment.strip()
-    if not stripped:
+    if not stripped or stripped[0] not in "{[":
         return None
 
-    candidate_indices = [
-        index for index, char in enumerate(stripped) if char in {"}", "]"}
-    ]
-    for index in reversed(candidate_indices):
-        candidate = stripped[: index + 1]
-        parsed = _try_parse_json(candidate)
-        if parsed is not None:
-            return parsed
+    tiefe = 0
+    for treffer in _JSON_STRUKTUR_RE.finditer(stripped):
+        zeichen = treffer.group()
+        if zeichen in "{[":
+            tiefe += 1
+        elif zeichen in "}]":
+            tiefe -= 1
+            if tiefe == 0:
+                return _try_parse_json(stripped[: treffer.end()])
+        # Vollständige Strings ändern die Tiefe nicht. Ein abgeschnittener String
+        # passt nicht auf das Muster; Klammern darin können nur Kandidaten liefern,
+        # die der Parser ohnehin verwirft.
 
     return None
 
@@ -88,79 +191,150 @@ def _peel_json(obj_or_str: Any, *, max_depth: int = 4) -> Tuple[Any, int]:
     Rückgabewert ist ein ``(objekt, tiefe)``-Tupel. ``tiefe`` beschreibt, wie oft
     erfolgreich geparst wurde. Dies hilft dabei zu erkennen, ob tatsächlich eine
     weitere JSON-Struktur gefunden wurde.
+
+    Als Vorprüfung genügt das erste Nicht-Leerzeichen: Nur ``{`` oder ``[`` kann ein
+    Objekt bzw. eine Liste einleiten. Ob das Ende passt, stellt der Parser ohnehin
+    fest; ein zusätzliches ``strip`` samt Kopie langer Strings entfällt damit.
     """
 
     depth = 0
     current = obj_or_str
-    while depth < max_depth:
-        if isinstance(current, str) and _looks_like_json(current):
-            try:
-                current = json.loads(current)
-            except Exception:
-                break
-            depth += 1
-            continue
-        break
+    while depth < max_depth and isinstance(current, str):
+        # ``lstrip`` liefert ohne führende Leerzeichen denselben String ohne Kopie.
+        kandidat = current.lstrip()
+        if not kandidat or kandidat[0] not in "{[":
+            break
+        try:
+            current = json_loads(kandidat)
+        except Exception:
+            break
+        depth += 1
     return current, depth
 
 
+def _lies_stream_zeilen(resp: requests.Response, roh_zeilen: list[bytes]) -> Iterator[bytes]:
+    """Liest eine per ``stream=True`` angeforderte Antwort zeilenweise als Bytes ein.
+
+    Jede Zeile wird zusätzlich in ``roh_zeilen`` abgelegt, damit bei einer
+    unvollständigen Antwort weiterhin der Rohtext für ``amboss_result_raw`` vorliegt.
+
+    Bewusst nicht ``resp.iter_lines``: Dort wird eine angefangene Zeile per
+    ``pending + chunk`` mit jedem weiteren Block verlängert. AMBOSS liefert das
+    Ergebnis oft als eine einzige ``data:``-Zeile über viele TCP-Blöcke; jede
+    Verlängerung kopiert dann den gesamten bisherigen Zeilenanfang (quadratischer
+    Aufwand). Hier werden die Bruchstücke in einer Liste gesammelt und erst am
+    Zeilenende einmal verbunden. Zeilenenden ``\r\n`` behalten ihr ``\r``; das
+    berücksichtigen ``_SSE_DATA_RE`` und ``_sse_events``.
+    """
+
+    bruchstuecke: list[bytes] = []
+    for block in resp.iter_content(chunk_size=8192):
+        if not block:
+            continue
+        teile = block.split(b"\n")
+        if len(teile) == 1:
+            # Kein Zeilenende im Block: nur merken, nichts kopieren.
+            bruchstuecke.append(block)
+            continue
+        bruchstuecke.append(teile[0])
+        teile[0] = b"".join(bruchstuecke)
+        # Das letzte Teilstück ist eine noch unvollständige Zeile (ggf. leer).
+        bruchstuecke = [teile.pop()]
+        for zeile in teile:
+            roh_zeilen.append(zeile)
+            yield zeile
+    rest = b"".join(bruchstuecke)
+    if rest:
+        roh_zeilen.append(rest)
+        yield rest
+
+
+def _roh_text(roh_zeilen: list[bytes]) -> str:
+    """Setzt die Rohzeilen für die Debug-Ablage wieder zu Text zusammen."""
+
+    return b"\n".join(roh_zeilen).decode("utf-8", errors="replace")
+
+
+def _sse_events(zeilen: Iterable[bytes]) -> Iterator[bytes]:
+    """Fasst SSE-Zeilen zu Event-Nutzlasten zusammen.
+
+    Viele SSE-Server stückeln ein einzelnes Event auf mehrere ``data:``-Zeilen und
+    trennen Events durch Leerzeilen. Die ``data:``-Zeilen eines Events werden daher
+    gepuffert und bei der nächsten Leerzeile gemeinsam ausgegeben; Kommentar- und
+    Keep-Alive-Zeilen sowie Felder wie ``event:`` fallen dabei weg.
+
+    Die Events bleiben Bytes: Der JSON-Parser liest UTF-8 direkt, wie es der
+    SSE-Standard vorschreibt, ohne Umweg über einen Python-String. ``requests`` hätte
+    ``text/event-stream`` ohne ``charset`` als Latin-1 gelesen; Umlaute kamen dann als
+    Mojibake an und mussten später in ``fix_mojibake`` repariert werden.
+    """
+
+    puffer: list[bytes] = []
+    for zeile in zeilen:
+        if zeile.rstrip(b"\r") == b"":
+            if puffer:
+                yield b"\n".join(puffer)
+                puffer = []
+            continue
+        treffer = _SSE_DATA_RE.match(zeile)
+        if treffer:
+            puffer.append(treffer.group(1))
+    if puffer:
+        yield b"\n".join(puffer)
+
+
 def _parse_response(resp: requests.Response) -> dict:
     """Wertet die Antwort des MCP aus und verarbeitet klassische JSON- sowie SSE-Antworten.
 
-    Hinweis zur Synchronität: ``requests`` liest den Body bei ``resp.text`` blockierend
-    ein. Erst wenn der Server die komplette Antwort übertragen hat, wird diese Funktion
-    aktiv. Eine vermeintlich „halbierte“ Nutzlast entsteht daher nicht durch zu frühes
-    Parsen, sondern allenfalls durch einen Abbruch auf Serverseite. Für solche Fälle
-    empfehlen sich die unten erwähnten Debug-Helfer, um den Rohtext zu untersuchen.
+    SSE-Antworten werden mit ``stream=True`` angefordert und zeilenweise gelesen. Sobald
+    ein Event mit ``result`` vollständig vorliegt, wird die Verbindung geschlossen und
+    das Ergebnis zurückgegeben; Server, die den Stream nach dem letzten Event noch offen
+    halten, verzögern die Antwort damit nicht mehr. Bricht der Server die Übertragung
+    vorher ab, greift die unten beschriebene Sicherung mit den Debug-Helfern
+    („amboss_result_raw“).
     """
     ctype = (resp.headers.get("Content-Type") or "").lower()
-    if "application/json" in ctype and "event-stream" not in ctype:
-        return resp.json()
-
-    # ``resp.text`` blockiert solange, bis der Server die Antwort vollständig übertragen
-    # hat. Damit beantworten wir die häufige Frage, ob der Stream eventuell „zu früh“
-    # verarbeitet wird: Nein, Requests liefert hier erst weiter, sobald alle Daten
-    # angekommen sind. Anschließend kann die SSE-Nutzlast in Ruhe ausgewertet werden.
-    # Dank des blockierenden Leseverhaltens erhalten wir hier stets den vollständigen
-    # Stream. Sollte der Server die Übertragung unerwartet abbrechen, wäre ``resp.text``
-    # bereits verkürzt. In so einem Fall lässt sich die Ursache über die Debug-Hilfen
-    # („amboss_result_raw“) nachvollziehen.
-    text_body = resp.text
-    if "event-stream" in ctype or "data:" in text_body or "event:" in text_body:
-        # Viele SSE-Server stückeln ein einzelnes Event auf mehrere ``data:``-Zeilen
-        # und trennen Events durch Leerzeilen. Deshalb puffern wir jede Sequenz von
-        # ``data:``-Zeilen, fügen sie vor dem Parsen zusammen und ignorieren
-        # Kommentar-/Keep-Alive-Zeilen. Für Debugging kann hier temporär ein
-        # ``st.write(raw_line)`` ergänzt werden, um den Stream vollständig sichtbar
-        # zu machen.
-        events: list[str] = []
-        buffer: list[str] = []
-        for raw_line in text_body.splitlines():
-            line = raw_line.rstrip("\r\n")
-            if line == "":
-                if buffer:
-                    events.append("\n".join(buffer))
-                    buffer = []
-                continue
-            if line.startswith(":"):
-                continue
-            if line.startswith("data:"):
-                buffer.append(line[len("data:") :].lstrip())
-                continue
-            # Andere SSE-Felder wie ``event:`` benötigen wir hier nicht explizit, sie
-            # werden für die JSON-Extraktion ignoriert.
-        if buffer:
-            events.append("\n".join(buffer))
-
-        result_object: Optional[dict] = None
-        for payload in events:
-            if not payload or payload == "[DONE]":
+    ist_sse = "event-stream" in ctype
+    if not ist_sse and "application/json" in ctype:
+        return json_loads(resp.content)
+
+    roh_zeilen: list[bytes] = []
+    if ist_sse:
+        quelle: Iterable[bytes] = _lies_stream_zeilen(resp, roh_zeilen)
+    else:
+        # Ohne SSE-Content-Type wird der Body wie bisher vollständig gelesen und nur
+        # dann als SSE ausgewertet, wenn er entsprechende Felder enthält.
+        body = resp.content
+        if b"data:" not in body and b"event:" not in body:
+            # Alle anderen Content-Types werden explizit abgefangen, um unerwartete
+            # Antworten früh zu erkennen. Auch hier landet der Rohtext im Session State
+            # für Debugging.
+            st.session_state["amboss_result_raw"] = {
+                "hinweis": "Unerwarteter Content-Type beim MCP-Aufruf.",
+                "content_type": ctype,
+                "rohtext": resp.text,
+            }
+            raise ValueError(f"Unerwarteter Content-Type: {ctype}")
+        roh_zeilen = body.splitlines()
+        quelle = roh_zeilen
+
+    # Für Debugging kann in ``_sse_events`` temporär ein ``st.write(zeile)`` ergänzt
+    # werden, um den Stream vollständig sichtbar zu machen.
+    result_object: Optional[dict] = None
+    erstes_fragment: Optional[bytes] = None
+    try:
+        for payload in _sse_events(quelle):
+            if not payload or payload == b"[DONE]":
                 continue
+            if erstes_fragment is None:
+                erstes_fragment = payload
 
-            # Erste Dekodierungsstufe: Direkt versuchen, den Payload zu laden.
+            # Erste Dekodierungsstufe: Die Bytes gehen unverändert an den Parser
+            # (``orjson`` liest UTF-8 ohne vorherige Umwandlung in einen String).
+            # Scheitert das, kann auch ein Entpacken nichts finden.
             current: Any = _try_parse_json(payload)
             if current is None:
-                current = payload
+                continue
 
             # Weitere Dekodierungsstufen: Manche Antworten enthalten JSON in JSON.
             current, _ = _peel_json(current)
@@ -169,89 +343,120 @@ def _parse_response(resp: requests.Response) -> dict:
                 if "error" in current:
                     raise RuntimeError(f"MCP error: {current.get('error')}")
                 if "result" in current:
+                    # Erstes vollständiges Ergebnis: Restlichen Stream nicht abwarten.
                     result_object = current
+                    break
+    finally:
+        # Schließt die Antwort auch bei vorzeitigem Ende. Ist der Stream noch nicht
+        # vollständig gelesen (Abbruch nach dem ersten ``result``), schließt ``requests``
+        # dabei den Socket, statt die Verbindung an den Pool der Session zurückzugeben;
+        # der nächste AMBOSS-Aufruf baut sie samt TLS-Handshake neu auf. Den Rest des
+        # Streams abzuwarten, wäre bei Servern, die ihn offen halten, deutlich langsamer.
+        resp.close()
+
+    if result_object is None:
+        # Sicherung: Wir bewahren das erste verwertbare Fragment auf (siehe
+        # ``erstes_fragment`` oben), damit die Anwendung trotz abgebrochener
+        # Serverantwort weiterarbeiten kann. Das Ergebnis wird klar als unvollständig
+        # markiert, sodass nachgelagerte Schritte reagieren können. Erst hier wird
+        # das Fragment für Anzeige und Teilrekonstruktion in Text umgewandelt.
+        fallback_payload: Optional[str] = (
+            erstes_fragment.decode("utf-8", errors="replace")
+            if erstes_fragment is not None
+            else None
+        )
+        partial_object = (
+            _recover_partial_json(fallback_payload) if fallback_payload else None
+        )
+
+        fallback_result: Dict[str, Any] = {
+            "jsonrpc": "2.0",
+            "id": None,
+            "result": {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            partial_object
+                            if partial_object is not None
+                            else fallback_payload
+                            if fallback_payload is not None
+                            else ""
+                        ),
+                    }
+                ]
+            },
+            "meta": {
+                "hinweis": "Fragment aus abgebrochener SSE-Antwort rekonstruiert.",
+                "unvollstaendig": True,
+            },
+        }
+
+        st.session_state["amboss_result_raw"] = {
+            "hinweis": "Keine vollständige JSON-RPC-Nutzlast in der SSE-Antwort gefunden.",
+            "rohtext": _roh_text(roh_zeilen),
+            "fragment": fallback_payload,
+            "fragment_teilobjekt": partial_object,
+        }
+        st.session_state["amboss_result_unvollstaendig"] = True
+        st.session_state["amboss_result_sicherung"] = {
+            "hinweis": "Teilantwort aufgrund eines Verbindungsabbruchs gespeichert.",
+            "fragment_quelle": "sse_event",
+            "fragment_text": fallback_payload,
+            "fragment_teilobjekt": partial_object,
+        }
+        return fallback_result
+
+    # Falls die eigentliche Information nochmals als String vorliegt, versuchen
+    # wir auch diese Ebene zu entpacken, damit nachgelagerte Module direkt mit
+    # Python-Strukturen arbeiten können.
+    try:
+        content_entries = result_object.get("result", {}).get("content", [])
+        for entry in content_entries:
+            if entry.get("type") == "text" and isinstance(entry.get("text"), str):
+                unpacked, depth = _peel_json(entry["text"], max_depth=3)
+                if depth > 0 and isinstance(unpacked, (dict, list)):
+                    entry["text"] = unpacked
+        # Das Ergebnis landet nur einmal im Session State, als ``amboss_result`` in
+        # ``call_amboss_search``. Eine zweite Ablage (früher ``amboss_result_inner``)
+        # hätte denselben, oft mehrere Megabyte großen Baum doppelt referenziert.
+    except Exception:
+        # Sollte das Entpacken wider Erwarten scheitern, kann durch temporäre
+        # ``st.write(entry)``-Ausgaben oberhalb geprüft werden, welche Struktur
+        # genau vorliegt. Wir lassen in diesem Fall den Originaltext unangetastet.
+        pass
+
+    st.session_state.pop("amboss_result_unvollstaendig", None)
+    st.session_state.pop("amboss_result_sicherung", None)
+    st.session_state.pop("amboss_result_raw", None)
+    return result_object
+
+
+@st.cache_data(ttl=_CACHE_TTL_SEKUNDEN, max_entries=_CACHE_MAX_EINTRAEGE, show_spinner=False)
+def _sende_anfrage_gecacht(
+    url: str,
+    payload: Dict[str, Any],
+    token_hash: str,
+    zusatz_header: Tuple[Tuple[str, str], ...],
+    timeout: float,
+    _headers: Dict[str, str],
+) -> dict:
+    """Sendet die MCP-Anfrage und liefert das ausgewertete Ergebnis.
 
-        if result_object is None:
-            # Sicherung: Wir bewahren das erste verwertbare Fragment auf, damit die
-            # Anwendung trotz abgebrochener Serverantwort weiterarbeiten kann. Das
-            # Ergebnis wird klar als unvollständig markiert, sodass nachgelagerte
-            # Schritte reagieren können.
-            fallback_payload: Optional[str] = next(
-                (payload for payload in events if payload and payload != "[DONE]"),
-                None,
-            )
-            partial_object = (
-                _recover_partial_json(fallback_payload) if fallback_payload else None
-            )
-
-            fallback_result: Dict[str, Any] = {
-                "jsonrpc": "2.0",
-                "id": None,
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                partial_object
-                                if partial_object is not None
-                                else fallback_payload
-                                if fallback_payload is not None
-                                else ""
-                            ),
-                        }
-                    ]
-                },
-                "meta": {
-                    "hinweis": "Fragment aus abgebrochener SSE-Antwort rekonstruiert.",
-                    "unvollstaendig": True,
-                },
-            }
-
-            st.session_state["amboss_result_raw"] = {
-                "hinweis": "Keine vollständige JSON-RPC-Nutzlast in der SSE-Antwort gefunden.",
-                "rohtext": text_body,
-                "fragment": fallback_payload,
-                "fragment_teilobjekt": partial_object,
-            }
-            st.session_state["amboss_result_unvollstaendig"] = True
-            st.session_state["amboss_result_sicherung"] = {
-                "hinweis": "Teilantwort aufgrund eines Verbindungsabbruchs gespeichert.",
-                "fragment_quelle": "sse_event",
-                "fragment_text": fallback_payload,
-                "fragment_teilobjekt": partial_object,
-            }
-            return fallback_result
+    Der Cache-Schlüssel besteht aus URL, Nutzlast, dem SHA256 des Tokens und den
+    Zusatz-Headern. Die eigentlichen ``_headers`` enthalten den Bearer-Token im
+    Klartext und werden dank des Unterstrichs nicht in den Schlüssel übernommen.
+    """
 
-        # Falls die eigentliche Information nochmals als String vorliegt, versuchen
-        # wir auch diese Ebene zu entpacken, damit nachgelagerte Module direkt mit
-        # Python-Strukturen arbeiten können.
-        try:
-            content_entries = result_object.get("result", {}).get("content", [])
-            for entry in content_entries:
-                if entry.get("type") == "text" and isinstance(entry.get("text"), str):
-                    unpacked, depth = _peel_json(entry["text"], max_depth=3)
-                    if depth > 0 and isinstance(unpacked, (dict, list)):
-                        entry["text"] = unpacked
-            st.session_state["amboss_result_inner"] = result_object
-        except Exception:
-            # Sollte das Entpacken wider Erwarten scheitern, kann durch temporäre
-            # ``st.write(entry)``-Ausgaben oberhalb geprüft werden, welche Struktur
-            # genau vorliegt. Wir lassen in diesem Fall den Originaltext unangetastet.
-            pass
-
-        st.session_state.pop("amboss_result_unvollstaendig", None)
-        st.session_state.pop("amboss_result_sicherung", None)
-        st.session_state.pop("amboss_result_raw", None)
-        return result_object
-
-    # Alle anderen Content-Types werden explizit abgefangen, um unerwartete Antworten
-    # früh zu erkennen. Auch hier landet der Rohtext im Session State für Debugging.
-    st.session_state["amboss_result_raw"] = {
-        "hinweis": "Unerwarteter Content-Type beim MCP-Aufruf.",
-        "content_type": ctype,
-        "rohtext": text_body,
-    }
-    raise ValueError(f"Unerwarteter Content-Type: {ctype}")
+    resp = amboss_http_session().post(
+        url, headers=_headers, data=json_dumps_bytes(payload), timeout=timeout, stream=True
+    )
+    resp.raise_for_status()
+    result = _parse_response(resp)
+    meta = result.get("meta") if isinstance(result, dict) else None
+    if isinstance(meta, dict) and meta.get("unvollstaendig"):
+        raise _UnvollstaendigeAntwort(result)
+    return result
 
 
 def call_amboss_search(
@@ -264,6 +469,7 @@ def call_amboss_search(
     extra_headers: Optional[Dict[str, str]] = None,
     max_retries: int = 0,
     retry_delay_seconds: float = 0.0,
+    nutze_cache: bool = True,
 ) -> dict:
     """Ruft ``search_article_sections`` auf und legt das Roh-JSON im Session State ab.
 
@@ -275,28 +481,29 @@ def call_amboss_search(
     oder unerwartete Antwortformate auftreten. Mit ``retry_delay_seconds`` kann eine
     Wartezeit zwischen den Versuchen hinterlegt werden, um den Server nicht sofort
     erneut zu belasten. Bei ``max_retries=0`` bleibt das bisherige Verhalten unverändert.
+
+    Vollständige Antworten werden bis zu einer Stunde zwischengespeichert (siehe
+    ``_sende_anfrage_gecacht``); mit ``nutze_cache=False`` wird AMBOSS in jedem Fall
+    neu abgefragt. Debug-Hinweis: ``_sende_anfrage_gecacht.clear()`` leert den Cache.
     """
-    token = token or st.secrets.get("Amboss_Token")
-    if not token:
-        raise ValueError("Amboss_Token not found. Please set in st.secrets or pass as argument.")
+    token = token or _amboss_token()
 
     payload = _build_payload(query, language=language)
     st.session_state["amboss_input_mcp"] = payload
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json, text/event-stream",
-    }
+    # ``Accept`` kommt aus den Standard-Headern der Session (``_STANDARD_HEADER``).
+    # Ohne Zusatz-Header wird das gecachte Dictionary direkt verwendet; ``requests``
+    # verändert übergebene Header nicht.
+    headers = _auth_header(token)
     if extra_headers:
-        headers.update(extra_headers)
+        headers = {**headers, **extra_headers}
+    token_hash = _token_hash(token)
+    zusatz_header = tuple(sorted((extra_headers or {}).items()))
 
     # Debug-Hinweis: Bei Bedarf kann hier ``st.write(headers, payload)`` aktiviert werden,
     # um die Anfrage im Detail zu inspizieren.
-    # Der Aufruf blockiert bis zur vollständigen Antwort; erst danach geht es in der
-    # Verarbeitung weiter. Wer experimentell live im Stream mitlesen möchte, kann
-    # ``stream=True`` ergänzen und in ``_parse_response`` auf ``resp.iter_lines``
-    # umstellen. Für die reguläre Nutzung ist das vollständige Puffern jedoch stabiler.
+    # Die Antwort wird mit ``stream=True`` angefordert; ``_parse_response`` liest sie
+    # zeilenweise und beendet das Lesen beim ersten vollständigen Ergebnis.
     attempts_total = max(0, int(max_retries)) + 1
     delay_seconds = max(0.0, float(retry_delay_seconds))
 
@@ -307,14 +514,26 @@ def call_amboss_search(
 
     for attempt_index in range(1, attempts_total + 1):
         try:
-            resp = requests.post(
-                url,
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=timeout,
-            )
-            resp.raise_for_status()
-            result = _parse_response(resp)
+            if nutze_cache:
+                result = _sende_anfrage_gecacht(
+                    url, payload, token_hash, zusatz_header, timeout, headers
+                )
+            else:
+                resp = amboss_http_session().post(
+                    url,
+                    headers=headers,
+                    data=json_dumps_bytes(payload),
+                    timeout=timeout,
+                    stream=True,
+                )
+                resp.raise_for_status()
+                result = _parse_response(resp)
+        except _UnvollstaendigeAntwort as teilantwort:
+            # Die Teilantwort wurde wie bisher markiert (``amboss_result_unvollstaendig``)
+            # und wird zurückgegeben, landet aber nicht im Cache.
+            st.session_state.pop("amboss_letzter_fehlversuch", None)
+            st.session_state["amboss_result"] = teilantwort.ergebnis
+            return teilantwort.ergebnis
         except (requests.RequestException, ValueError) as exc:
             # Fehlerfall: Wir notieren Versuchszähler und Fehlertyp für spätere Analyse.
             last_error_info = {
@@ -341,6 +560,12 @@ def call_amboss_search(
             # Erfolgreicher Durchlauf: Wir räumen eventuelle Fehlereinträge wieder auf,
             # damit andere Module ausschließlich gültige Ergebnisse vorfinden.
             st.session_state.pop("amboss_letzter_fehlversuch", None)
+            if not (result.get("meta") or {}).get("unvollstaendig"):
+                # Bei einem Cache-Treffer läuft ``_parse_response`` nicht; Markierungen
+                # einer früheren Teilantwort werden deshalb hier entfernt.
+                st.session_state.pop("amboss_result_unvollstaendig", None)
+                st.session_state.pop("amboss_result_sicherung", None)
+                st.session_state.pop("amboss_result_raw", None)
             st.session_state["amboss_result"] = result
             return result
 
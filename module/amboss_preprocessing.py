@@ -3,11 +3,12 @@
 from __future__ import annotations
 
 import hashlib
-import json
 from typing import Any, Optional
 
 import streamlit as st
 
+from module.json_backend import json_dumps_bytes
+from module.openai_client import chat_completion
 from module.token_counter import add_usage, init_token_counters
 
 # Session-State-Schlüssel, unter denen die verdichteten Informationen abgelegt werden.
@@ -16,10 +17,18 @@ _DIGEST_KEY = "amboss_payload_summary_digest"
 
 
 def _serialize_payload(payload: Any) -> str:
-    """Wandelt die ursprüngliche AMBOSS-Antwort in einen stabilen JSON-String um."""
+    """Wandelt die ursprüngliche AMBOSS-Antwort in einen stabilen JSON-String um.
+
+    Der String dient nur als GPT-Eingabe und als Grundlage des Digests. Ohne
+    Einrückung und mit kompakten Trennzeichen entfallen Leerzeichen und
+    Zeilenumbrüche, die das Modell nicht braucht – das spart bei verschachtelten
+    Nutzlasten spürbar Prompt-Tokens. ``sort_keys`` bleibt für einen stabilen Digest.
+    Die Serialisierung übernimmt ``module/json_backend.py`` (``orjson``, falls
+    installiert).
+    """
 
     try:
-        return json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True)
+        return json_dumps_bytes(payload, sort_keys=True).decode("utf-8")
     except TypeError:
         # Sollte das Objekt nicht JSON-serialisierbar sein, greifen wir auf ``str``
         # zurück. Für detailliertes Debugging kann hier ein ``st.write`` ergänzt
@@ -91,7 +100,8 @@ def ensure_amboss_summary(
     )
 
     init_token_counters()
-    response = client.chat.completions.create(
+    response = chat_completion(
+        client,
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.2,
@@ -2,8 +2,8 @@
 
 Die Funktionen in diesem Modul extrahieren Tabellen, strukturierte Inhalte und
 roh eingebettete JSON-Fragmente aus den vom AMBOSS-MCP gelieferten Antworten.
-Damit steht im Adminbereich sowie in Hilfstools dieselbe aufbereitete
-Markdown-Darstellung zur Verfügung wie in ``mcp_streamable_test``.
+Adminbereich und ``mcp_streamable_test`` nutzen diese Funktionen gemeinsam, damit
+die Aufbereitung nur an einer Stelle gepflegt werden muss.
 
 Alle Kommentare sind bewusst ausführlich gehalten, um spätere Anpassungen und
 Debugging zu erleichtern.
@@ -11,19 +11,54 @@ Debugging zu erleichtern.
 
 from __future__ import annotations
 
-import json
 import re
 from typing import Iterable, Optional
 
+import streamlit as st
+
+from module.json_backend import json_dumps_pretty, json_loads
+
+# Alle regulären Ausdrücke werden einmalig beim Import kompiliert. ``re.sub`` mit
+# einem Musterstring schlägt das Muster bei jedem Aufruf erneut im internen Cache
+# nach; bei Dutzenden Ergebnissen mit Hunderten Tabellenzellen summiert sich das.
+# Sämtliche AMBOSS-Platzhalter werden von einem einzigen Muster erfasst. ``RefNote``
+# steht in der Alternation vor dem allgemeinen ``Ref``, damit Fußnoten nicht als
+# gewöhnliche Referenz entfernt werden.
+_PLACEHOLDER_RE = re.compile(r"\{(/?Sub|/?Sup|NewLine|RefNote:[^}]+|Ref[^}]+)\}")
+_PLACEHOLDER_MAP = {
+    "Sub": "<sub>",
+    "/Sub": "</sub>",
+    "Sup": "<sup>",
+    "/Sup": "</sup>",
+    "NewLine": "<br>",
+}
+_RE_MULTISPACE = re.compile(r"[ \t]{2,}")
+_RE_BR_PIPE = re.compile(r"(?:<br>\s*)+\|")
+_RE_BLANKS = re.compile(r"\n{3,}")
+_RE_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$")
+# Tabellenzellen: führende und abschließende ``<br>`` sowie ``{Ref…}``-Verweise werden
+# gemeinsam in einem Durchlauf entfernt. Da die Alternativen auf dem ursprünglichen
+# Zelltext ausgewertet werden, entspricht das Ergebnis den früheren drei Einzelaufrufen.
+_RE_CELL_CLEANUP = re.compile(r"^(?:<br>\s*)+|(?:\s*<br>)+$|\{Ref[^}]*\}")
+
 
 def fix_mojibake(text: str) -> str:
     """Repariert typische Kodierungsfehler, die in MCP-Antworten auftreten können."""
 
     if not isinstance(text, str):
         return text
+    # Reiner ASCII-Text kann kein Mojibake enthalten; ``str.isascii`` liest nur ein
+    # internes Flag und erspart das Hin- und Zurückkodieren für die meisten Titel,
+    # Zellen und Snippets.
+    if text.isascii():
+        return text
     try:
         return text.encode("latin1").decode("utf-8")
     except Exception:
+        # Alle bekannten Fehlsequenzen beginnen mit "â" oder "Â". Korrekter Text
+        # (z. B. mit Umlauten) durchläuft die Ersetzungen deshalb gar nicht erst.
+        if "â" not in text and "Â" not in text:
+            return text
         # Sollte das Re-Encoding nicht funktionieren, werden einzelne bekannte
         # Platzhalter ersetzt. Für erweitertes Debugging kann hier eine
         # ``print``-Ausgabe aktiviert werden, um problematische Zeichenketten zu
@@ -50,15 +85,24 @@ def clean_placeholders(text: str, url: Optional[str] = None) -> str:
     if not isinstance(text, str):
         return text
     cleaned = fix_mojibake(text)
-    cleaned = cleaned.replace("{Sub}", "<sub>").replace("{/Sub}", "</sub>")
-    cleaned = cleaned.replace("{Sup}", "<sup>").replace("{/Sup}", "</sup>")
-    cleaned = cleaned.replace("{NewLine}", "<br>")
-    if url:
-        cleaned = re.sub(r"\{RefNote:[^}]+\}", f"[†]({url})", cleaned)
-    else:
-        cleaned = re.sub(r"\{RefNote:[^}]+\}", "†", cleaned)
-    cleaned = re.sub(r"\{Ref[^\}]+\}", "", cleaned)
-    cleaned = re.sub(r"[ \t]{2,}", " ", cleaned)
+    refnote = f"[†]({url})" if url else "†"
+
+    def _resolve(match: re.Match) -> str:
+        # Formatierungs-Platzhalter werden über die Tabelle aufgelöst, Fußnoten als
+        # †-Link gesetzt und alle übrigen ``{Ref…}``-Verweise entfernt.
+        name = match.group(1)
+        if name in _PLACEHOLDER_MAP:
+            return _PLACEHOLDER_MAP[name]
+        return refnote if name.startswith("RefNote:") else ""
+
+    # Früher liefen fünf ``replace``- und drei ``re.sub``-Aufrufe nacheinander über den
+    # Text; jetzt wird er für die Platzhalter genau einmal durchlaufen. Viele Snippets
+    # sind schlichte Sätze: Die ``in``-Prüfungen laufen in C und ersparen dann die
+    # Regex-Durchläufe vollständig.
+    if "{" in cleaned:
+        cleaned = _PLACEHOLDER_RE.sub(_resolve, cleaned)
+    if "  " in cleaned or "\t" in cleaned:
+        cleaned = _RE_MULTISPACE.sub(" ", cleaned)
     return cleaned
 
 
@@ -66,7 +110,7 @@ def try_parse_json(text: str) -> Optional[dict]:
     """Versucht, einen JSON-String zu parsen; bei Fehlern wird ``None`` geliefert."""
 
     try:
-        return json.loads(text)
+        return json_loads(text)
     except Exception:
         # Für tiefergehendes Debugging kann hier ein Logging-Aufruf ergänzt
         # werden, der den fehlerhaften Ausschnitt mitsamt Exception protokolliert.
@@ -78,15 +122,28 @@ def try_parse_embedded_json_text(content_item_text: str) -> Optional[dict]:
 
     if not isinstance(content_item_text, str):
         return None
+    # Vorprüfung wie in ``MCP_Amboss._peel_json``: Reiner Artikeltext (oft mehrere
+    # hundert Kilobyte) beginnt nicht mit ``{`` oder ``[`` und muss weder die
+    # Mojibake-Reparatur noch einen Parser-Versuch durchlaufen.
+    if content_item_text.lstrip()[:1] not in ("{", "["):
+        return None
     return try_parse_json(fix_mojibake(content_item_text))
 
 
 def fix_inline_table_breaks(markdown: str) -> str:
     """Stellt sicher, dass Tabellen nicht durch ``<br>``-Zeilenumbrüche zerstört werden."""
 
-    markdown = re.sub(r"(?:<br>\s*)+\|", r"\n|", markdown)
-    markdown = re.sub(r"([^\n])\s*<br>\s*(\|)", r"\1\n\2", markdown)
-    markdown = re.sub(r"\n{3,}", "\n\n", markdown)
+    # Das erste Muster benötigt ``<br>`` und eine Pipe, das zweite mindestens drei
+    # Zeilenumbrüche in Folge. Fehlt das, bleibt der Text ohne Regex-Lauf gleich.
+    #
+    # Früher folgte noch ``([^\n])\s*<br>\s*(\|)`` → ``\1\n\2``. Dieses Muster setzt
+    # ein ``<br>`` direkt vor einer Pipe voraus – genau solche Stellen hat
+    # ``_RE_BR_PIPE`` aber bereits vollständig ersetzt, ohne neue ``<br>`` einzufügen.
+    # Der zweite Durchlauf konnte also nie etwas ändern und entfällt.
+    if "<br>" in markdown and "|" in markdown:
+        markdown = _RE_BR_PIPE.sub(r"\n|", markdown)
+    if "\n\n\n" in markdown:
+        markdown = _RE_BLANKS.sub("\n\n", markdown)
     return markdown
 
 
@@ -94,18 +151,23 @@ def format_markdown_tables(markdown: str) -> str:
     """Normalisiert Tabellenblöcke und entfernt überflüssige Platzhalter."""
 
     lines = markdown.splitlines()
+    if "|" not in markdown:
+        # Ohne Pipe gibt es keine Tabellenzeile; die zeilenweise Prüfung entfällt. Das
+        # Ergebnis entspricht dem der Schleife (Zeilen unverändert neu verbunden).
+        return "\n".join(lines)
     out: list[str] = []
     i = 0
     n = len(lines)
-    table_pattern = re.compile(r"^\s*\|.*\|\s*$")
+    table_pattern = _RE_TABLE_ROW
 
     def clean_cell(cell: str) -> str:
         cell = cell.strip()
-        cell = re.sub(r"^(?:<br>\s*)+", "", cell)
-        cell = re.sub(r"(?:\s*<br>)+$", "", cell)
+        cell = _RE_CELL_CLEANUP.sub("", cell)
+        # ``{NewLine}`` wird erst nach dem Entfernen der Rand-``<br>`` ersetzt und die
+        # Leerzeichen erst danach zusammengefasst – wie in der früheren Reihenfolge,
+        # damit durch entfernte Verweise entstandene Lücken verschmelzen.
         cell = cell.replace("{NewLine}", "<br>")
-        cell = re.sub(r"\{Ref[^}]*\}", "", cell)
-        cell = re.sub(r"[ \t]{2,}", " ", cell).strip()
+        cell = _RE_MULTISPACE.sub(" ", cell).strip()
         return cell
 
     def is_separator(cell: str) -> bool:
@@ -200,7 +262,14 @@ def render_items(items: Iterable[dict]) -> list[str]:
 
 
 def build_pretty_markdown(data: dict) -> str:
-    """Erstellt die aufbereitete Markdown-Ausgabe analog zur Testoberfläche."""
+    """Erstellt die aufbereitete Markdown-Ausgabe analog zur Testoberfläche.
+
+    Konvention: ``render_items`` und die Segmentschleife liefern bereits bereinigte
+    Blöcke (Platzhalter, ``<br>``-Umbrüche, Tabellen). Beim Zusammenfügen entstehen
+    keine neuen Tabellenzeilen, da Blöcke mit Titelzeilen bzw. ``---`` beginnen. Ein
+    zweiter Durchlauf über das Gesamtergebnis entfällt daher; Tabellen werden genau
+    einmal normalisiert.
+    """
 
     if not isinstance(data, dict):
         return "Keine gültigen AMBOSS-Daten vorhanden."
@@ -217,8 +286,7 @@ def build_pretty_markdown(data: dict) -> str:
     if items:
         blocks = ["### Ergebnisse"]
         blocks.extend(render_items(items))
-        markdown = ("\n\n---\n\n").join(blocks)
-        return format_markdown_tables(fix_inline_table_breaks(markdown))
+        return ("\n\n---\n\n").join(blocks)
 
     if isinstance(result, dict) and "content" in result:
         content = result["content"]
@@ -248,14 +316,13 @@ def build_pretty_markdown(data: dict) -> str:
                         else:
                             embedded_blocks.append(
                                 "```json\n"
-                                + json.dumps(embedded, ensure_ascii=False, indent=2)
+                                + json_dumps_pretty(embedded)
                                 + "\n```"
                             )
             if parsed_any and embedded_blocks:
-                markdown = ("\n\n").join(
+                return ("\n\n").join(
                     ["### Extrahierte Ergebnisse (eingebettetes JSON)"] + embedded_blocks
                 )
-                return format_markdown_tables(fix_inline_table_breaks(markdown))
 
             segment_blocks: list[str] = []
             for segment in content:
@@ -267,31 +334,39 @@ def build_pretty_markdown(data: dict) -> str:
                 else:
                     segment_blocks.append(
                         "```json\n"
-                        + json.dumps(segment, ensure_ascii=False, indent=2)
+                        + json_dumps_pretty(segment)
                         + "\n```"
                     )
-            markdown = ("\n\n---\n\n").join(["### Inhalt (Segmente)"] + segment_blocks)
-            return format_markdown_tables(fix_inline_table_breaks(markdown))
+            return ("\n\n---\n\n").join(["### Inhalt (Segmente)"] + segment_blocks)
 
         return (
             "Unbekanntes 'content'-Format:\n\n"
             "```json\n"
-            + json.dumps(content, ensure_ascii=False, indent=2)
+            + json_dumps_pretty(content)
             + "\n```"
         )
 
     return (
         "Unbekannter 'result'-Inhalt:\n\n"
         "```json\n"
-        + json.dumps(result, ensure_ascii=False, indent=2)
+        + json_dumps_pretty(result)
         + "\n```"
     )
 
 
+@st.cache_data(max_entries=64, show_spinner=False)
 def render_markdown_for_display(data: dict) -> str:
-    """Bequeme Wrapper-Funktion, die das Ergebnis final für ``st.code`` aufbereitet."""
+    """Bequeme Wrapper-Funktion, die das Ergebnis final für ``st.code`` aufbereitet.
 
-    markdown = build_pretty_markdown(data)
-    markdown = fix_inline_table_breaks(markdown)
-    markdown = format_markdown_tables(markdown)
-    return markdown
+    Das Ergebnis wird über ``st.cache_data`` zwischengespeichert. Streamlit bildet den
+    Schlüssel aus dem Inhalt von ``data``; bei jedem Rerun mit derselben Antwort (etwa
+    im Adminbereich, solange ``amboss_result`` unverändert bleibt) entfällt damit die
+    komplette Aufbereitung samt Tabellen-Durchläufen. Debug-Hinweis: Nach Änderungen
+    an den Hilfsfunktionen leert ``render_markdown_for_display.clear()`` den Cache.
+
+    Früher folgte hier ein weiterer „Sicherheitsdurchlauf“ über Tabellen und
+    ``<br>``-Umbrüche. ``build_pretty_markdown`` normalisiert jeden Zweig bereits
+    vollständig (siehe dortige Konvention), der Durchlauf war daher doppelt.
+    """
+
+    return build_pretty_markdown(data)
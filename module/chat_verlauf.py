@@ -0,0 +1,93 @@
+"""Begrenzung des Anamnese-Verlaufs für API-Aufrufe und Session-State.
+
+Bisher wurde bei jeder Frage der komplette Verlauf an OpenAI geschickt. Tokenkosten,
+Upload und Antwortzeit wachsen dadurch mit jeder Frage. Dieses Modul trennt zwei
+Dinge:
+
+* ``sende_fenster`` liefert die Nachrichten, die tatsächlich an die API gehen:
+  den festen Präfix (System-Prompt und Begrüßung) plus die letzten Nachrichten.
+  Der Präfix bleibt unverändert, damit der Prompt-Cache von OpenAI weiter greift
+  (siehe ``prompt_cache_key`` in ``prepare_fall_session_state``).
+* ``begrenze_verlauf`` kürzt den im Session-State gespeicherten Verlauf erst bei
+  einer sehr hohen Obergrenze und ersetzt die ältesten Einträge durch einen
+  sichtbaren Hinweis. Die Fragenliste für das Feedback (``user_verlauf_parts``) bleibt
+  davon unberührt.
+
+Beide Grenzen lassen sich über ``KARINA_SENDE_FENSTER`` bzw. ``KARINA_MAX_VERLAUF``
+anpassen. Eine ``collections.deque`` mit ``maxlen`` kommt bewusst nicht zum Einsatz:
+Sie würde beim Überlauf zuerst den System-Prompt verwerfen, und ``messages[1:]`` an
+den Anzeigestellen wäre auf einer ``deque`` nicht möglich.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+
+def _lies_grenze(variable: str, standard: int) -> int:
+    """Liest eine positive Ganzzahl aus der Umgebung, sonst ``standard``."""
+
+    try:
+        wert = int(os.getenv(variable, ""))
+    except ValueError:
+        return standard
+    return wert if wert > 0 else standard
+
+
+# System-Prompt und Begrüßung bilden den festen Präfix jedes Chat-Aufrufs.
+PRAEFIX_LAENGE = 2
+
+# Anzahl der zuletzt gesendeten Nachrichten (20 Frage-Antwort-Paare). Der Wert ist
+# bewusst großzügiger als übliche Beispiele, weil frühe Angaben des Patienten in
+# einer Anamnese später wieder relevant werden können.
+SENDE_FENSTER = _lies_grenze("KARINA_SENDE_FENSTER", 40)
+
+# Obergrenze für den gespeicherten Verlauf im Session-State.
+# Der Wert darf das Sendefenster nicht unterschreiten, sonst gingen Nachrichten verloren,
+# die noch an die API geschickt werden sollen.
+MAX_VERLAUF = max(
+    _lies_grenze("KARINA_MAX_VERLAUF", 500), PRAEFIX_LAENGE + 1 + SENDE_FENSTER
+)
+
+KUERZUNGS_HINWEIS = "[… frühere Gesprächsbeiträge wurden gekürzt]"
+
+
+def sende_fenster(
+    messages: list[dict[str, Any]], behalten: int = SENDE_FENSTER
+) -> list[dict[str, Any]]:
+    """Gibt den festen Präfix plus die letzten ``behalten`` Nachrichten zurück."""
+
+    if len(messages) <= PRAEFIX_LAENGE + behalten:
+        return messages
+    return messages[:PRAEFIX_LAENGE] + messages[-behalten:]
+
+
+def begrenze_verlauf(messages: list[dict[str, Any]], maximal: int = MAX_VERLAUF) -> None:
+    """Kürzt ``messages`` an Ort und Stelle auf höchstens ``maximal`` Einträge.
+
+    Die ältesten Nachrichten nach dem Präfix werden entfernt und durch einen einzigen
+    Hinweis ersetzt, damit in der Oberfläche erkennbar bleibt, dass gekürzt wurde.
+    """
+
+    if len(messages) <= maximal:
+        return
+
+    hinweis_vorhanden = (
+        len(messages) > PRAEFIX_LAENGE
+        and messages[PRAEFIX_LAENGE].get("content") == KUERZUNGS_HINWEIS
+    )
+    start = PRAEFIX_LAENGE + (1 if hinweis_vorhanden else 0)
+    ueberschuss = len(messages) - maximal + (0 if hinweis_vorhanden else 1)
+    del messages[start:start + ueberschuss]
+    if not hinweis_vorhanden:
+        messages.insert(PRAEFIX_LAENGE, {"role": "assistant", "content": KUERZUNGS_HINWEIS})
+
+
+__all__ = [
+    "KUERZUNGS_HINWEIS",
+    "MAX_VERLAUF",
+    "SENDE_FENSTER",
+    "begrenze_verlauf",
+    "sende_fenster",
+]
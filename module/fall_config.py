@@ -22,6 +22,8 @@ __all__ = [
     "get_amboss_fetch_preferences",
     "set_amboss_fetch_mode",
     "set_amboss_random_probability",
+    "get_feedback_batch_mode",
+    "set_feedback_batch_mode",
     "get_all_persisted_parameters",
     "AMBOSS_FETCH_ALWAYS",
     "AMBOSS_FETCH_IF_EMPTY",
@@ -346,6 +348,24 @@ def set_amboss_random_probability(probability: float) -> None:
     )
 
 
+def get_feedback_batch_mode() -> bool:
+    """Gibt zurück, ob das Abschlussfeedback über die OpenAI-Batch-API laufen soll."""
+
+    entry = _get_entry("feedback_batch")
+    return bool(entry and entry.get("is_active"))
+
+
+def set_feedback_batch_mode(active: bool) -> None:
+    """Schaltet den Batch-Modus für das Abschlussfeedback dauerhaft ein oder aus."""
+
+    _persist_fixation(
+        "feedback_batch",
+        is_active=bool(active),
+        value_text="batch" if active else "",
+        value_number=None,
+    )
+
+
 def get_all_persisted_parameters() -> Dict[str, Dict[str, Any]]:
     """Liefert eine lesbare Übersicht aller aktuell gespeicherten Parameter."""
 
@@ -1,7 +1,10 @@
 # """Hilfsfunktionen zur Verwaltung und Auswahl der Fallszenarien."""
 from __future__ import annotations
 
+import hashlib
+import os
 import random
+from pathlib import Path
 from typing import Any, Iterable, Mapping
 
 import pandas as pd
@@ -12,6 +15,7 @@ from module.patient_language import get_patient_forms
 from module.MCP_Amboss import call_amboss_search
 from module.amboss_preprocessing import ensure_amboss_summary, clear_cached_summary
 from module.loading_indicator import task_spinner
+from module.openai_client import get_openai_client
 from module.fall_config import (
     AMBOSS_FETCH_ALWAYS,
     AMBOSS_FETCH_IF_EMPTY,
@@ -27,6 +31,19 @@ _AMBOSS_PERSIST_STATE_KEY = "amboss_persist_info"
 # Name der Supabase-Tabelle, in der sämtliche Fallszenarien abgelegt werden.
 _FALL_TABLE_NAME = "fallbeispiele"
 
+# Spalten der Namensliste, die ``prepare_fall_session_state`` tatsächlich auswertet.
+# Weitere Spalten in der CSV werden beim Einlesen verworfen.
+_NAMENSLISTE_SPALTEN: frozenset[str] = frozenset(
+    {"vorname", "nachname", "geschlecht", "beruf", "beruf_m", "beruf_w"}
+)
+
+# Ablageort der Parquet-Schnappschüsse (liegt in ``.gitignore``).
+_PARQUET_CACHE_DIR = Path(".cache")
+
+# Lebensdauer der zwischengespeicherten Fallliste. Neue Fälle aus dem Adminbereich
+# leeren den Cache sofort; die TTL greift nur bei Änderungen direkt in Supabase.
+_FALLLISTE_CACHE_TTL_SEKUNDEN = 3600
+
 # Abbildung zwischen Supabase-Spalten (snake_case) und den bisherigen DataFrame-
 # Spalten mit deutschsprachigen Bezeichnungen. So bleibt die bestehende
 # Verarbeitung kompatibel, obwohl die Datenquelle gewechselt wurde.
@@ -78,6 +95,9 @@ _FALL_SESSION_KEYS: set[str] = {
     "diagnostik_aktiv",
     "diagnostik_runden_gesamt",
     "messages",
+    "user_msg_count",
+    "user_verlauf_parts",
+    "prompt_cache_key",
     "koerper_befund",
     "user_ddx2",
     "user_diagnostics",
@@ -86,11 +106,15 @@ _FALL_SESSION_KEYS: set[str] = {
     "gpt_befunde",
     "diagnostik_eingaben_kumuliert",
     "gpt_befunde_kumuliert",
+    "befunde_runden",
     "final_diagnose",
     "therapie_vorschlag",
     "final_feedback",
     "feedback_prompt_final",
     "feedback_row_id",
+    "feedback_speicherung",
+    "feedback_batch_id",
+    "feedback_batch_sofort",
     "student_evaluation_done",
     "token_sums",
 }
@@ -201,6 +225,10 @@ def _persist_amboss_input(*, row_id: Any, value: str) -> tuple[bool, str | None]
         )
         return False, "Kein Datensatz mit der angegebenen ID gefunden."
 
+    # Die zwischengespeicherte Fallliste enthält noch den alten ``Amboss_Input``.
+    # Ohne Invalidierung würden nachfolgende Sitzungen im Modus "nur bei leerem
+    # Feld abrufen" den MCP unnötig erneut kontaktieren.
+    leere_fallbeispiel_cache()
     return True, "Zusammenfassung erfolgreich gespeichert."
 
 
@@ -208,7 +236,6 @@ def _clear_amboss_session_cache() -> None:
     """Entfernt alle AMBOSS-bezogenen Session-Werte für ein sauberes Szenario."""
 
     st.session_state.pop("amboss_result", None)
-    st.session_state.pop("amboss_result_inner", None)
     st.session_state.pop("amboss_result_raw", None)
     st.session_state.pop("amboss_result_unvollstaendig", None)
     st.session_state.pop("amboss_result_sicherung", None)
@@ -247,17 +274,34 @@ def get_verhaltensoptionen() -> dict[str, str]:
 
     return dict(_VERHALTENSOPTIONEN)
 
-def lade_fallbeispiele() -> pd.DataFrame:
-    """Liest alle Fallbeispiele aus der Supabase-Tabelle ein."""
+
+class _FalllisteLadefehler(RuntimeError):
+    """Signalisiert einen fehlgeschlagenen Abruf der Fallliste inklusive Debug-Hinweis."""
+
+    def __init__(self, meldung: str, hinweis: str | None = None) -> None:
+        super().__init__(meldung)
+        self.hinweis = hinweis
+
+
+@st.cache_data(ttl=_FALLLISTE_CACHE_TTL_SEKUNDEN, show_spinner=False)
+def _lade_fallbeispiele_cached() -> pd.DataFrame:
+    """Liest die Fallbeispiele aus Supabase und legt das Ergebnis im Streamlit-Cache ab.
+
+    Der Cache gilt prozessweit, d. h. alle Sitzungen teilen sich denselben
+    Abruf. Fehler werden bewusst als Exception weitergereicht: ``st.cache_data``
+    speichert Ausnahmen nicht, sodass ein Netzwerkaussetzer nicht eine Stunde
+    lang als leere Tabelle im Cache hängen bleibt. Für Debugging kann der Cache
+    über ``leere_fallbeispiel_cache()`` oder das Streamlit-Menü ("Clear cache")
+    geleert werden.
+    """
 
     try:
         client = _get_supabase_client()
     except RuntimeError as exc:
-        st.error(f"❌ Supabase nicht erreichbar: {exc}")
-        st.info(
-            "Debug-Hinweis: Bitte prüfe die Supabase-Konfiguration in st.secrets sowie die Netzwerkverbindung."
-        )
-        return pd.DataFrame(columns=list(_SUPABASE_TO_DF.values()))
+        raise _FalllisteLadefehler(
+            f"❌ Supabase nicht erreichbar: {exc}",
+            "Debug-Hinweis: Bitte prüfe die Supabase-Konfiguration in st.secrets sowie die Netzwerkverbindung.",
+        ) from exc
 
     try:
         response = (
@@ -267,19 +311,17 @@ def lade_fallbeispiele() -> pd.DataFrame:
             .execute()
         )
     except Exception as exc:  # pragma: no cover - Netzwerkaussetzer lassen sich schwer simulieren
-        st.error(f"❌ Abruf der Supabase-Tabelle '{_FALL_TABLE_NAME}' fehlgeschlagen: {exc}")
-        st.info(
-            "Debug-Hinweis: Nutze bei Bedarf die Supabase-Konsole, um Logs und Berechtigungen zu kontrollieren."
-        )
-        return pd.DataFrame(columns=list(_SUPABASE_TO_DF.values()))
+        raise _FalllisteLadefehler(
+            f"❌ Abruf der Supabase-Tabelle '{_FALL_TABLE_NAME}' fehlgeschlagen: {exc}",
+            "Debug-Hinweis: Nutze bei Bedarf die Supabase-Konsole, um Logs und Berechtigungen zu kontrollieren.",
+        ) from exc
 
     if getattr(response, 'error', None):
-        st.error(
+        raise _FalllisteLadefehler(
             "❌ Supabase meldet einen Fehler beim Laden der Fallliste: {err}.".format(
                 err=response.error
             )
         )
-        return pd.DataFrame(columns=list(_SUPABASE_TO_DF.values()))
 
     rows = response.data or []
     if not rows:
@@ -311,6 +353,50 @@ def lade_fallbeispiele() -> pd.DataFrame:
     return df
 
 
+def lade_fallbeispiele() -> pd.DataFrame:
+    """Liest alle Fallbeispiele aus der Supabase-Tabelle ein.
+
+    Die eigentliche Abfrage ist über ``st.cache_data`` zwischengespeichert.
+    Streamlit liefert bei jedem Aufruf eine Kopie des DataFrames, sodass
+    aufrufende Seiten die Tabelle gefahrlos verändern können.
+    """
+
+    try:
+        return _lade_fallbeispiele_cached()
+    except _FalllisteLadefehler as exc:
+        st.error(str(exc))
+        if exc.hinweis:
+            st.info(exc.hinweis)
+        return pd.DataFrame(columns=list(_SUPABASE_TO_DF.values()))
+
+
+@st.cache_data(ttl=_FALLLISTE_CACHE_TTL_SEKUNDEN, show_spinner=False)
+def lade_szenario_namen() -> frozenset[str]:
+    """Liefert die Menge aller Szenarionamen der Fallliste (zwischengespeichert).
+
+    Die Startseite prüft bei fixierten Fällen nur, ob ein Szenario existiert.
+    Statt bei jedem Sitzungsstart die komplette Spalte erneut zu durchlaufen,
+    wird die Menge einmal pro Cache-Periode gebildet. Schlägt der Abruf fehl,
+    wird die Exception von ``_lade_fallbeispiele_cached`` durchgereicht und
+    nichts zwischengespeichert.
+    """
+
+    df = _lade_fallbeispiele_cached()
+    if "Szenario" not in df.columns:
+        return frozenset()
+    # Vektorisiert statt einer Python-Schleife über alle Zeilen: ``astype``/``str.strip``
+    # laufen innerhalb von pandas, leere Einträge werden anschließend herausgefiltert.
+    namen = df["Szenario"].dropna().astype(str).str.strip()
+    return frozenset(namen[namen.ne("")].unique())
+
+
+def leere_fallbeispiel_cache() -> None:
+    """Verwirft die zwischengespeicherte Fallliste, z. B. nach Änderungen in Supabase."""
+
+    _lade_fallbeispiele_cached.clear()
+    lade_szenario_namen.clear()
+
+
 
 
 
@@ -359,6 +445,8 @@ def speichere_fallbeispiel(
         return None, f"Supabase meldet einen Fehler: {response.error}"
 
     # Nach erfolgreichem Insert wird die aktuelle Tabelle erneut geladen, damit Admin-UI und Session-State synchron bleiben.
+    # Der Cache muss vorher geleert werden, sonst würde die alte Liste ohne den neuen Fall ausgeliefert.
+    leere_fallbeispiel_cache()
     return lade_fallbeispiele(), None
 
 
@@ -475,7 +563,7 @@ def fallauswahl_prompt(
             _clear_amboss_session_cache()
         indikator.advance(1)
 
-        client = st.session_state.get("openai_client")
+        client = get_openai_client()
         patient_age_for_summary = st.session_state.get("patient_age")
         if patient_age_for_summary is None:
             patient_age_for_summary = st.session_state.get("patient_alter_basis")
@@ -598,6 +686,37 @@ def fallauswahl_prompt(
         # optionalen Fachkontext kompakt zu halten.
 
 
+@st.cache_data(show_spinner=False)
+def _lade_namensliste(pfad: str, signatur: tuple[int, int]) -> pd.DataFrame:
+    """Liest die Namensliste über einen Parquet-Schnappschuss ein.
+
+    ``signatur`` besteht aus Änderungszeit und Dateigröße der CSV. Sie ist Teil des
+    Cache-Schlüssels und des Dateinamens, sodass eine geänderte CSV automatisch neu
+    eingelesen wird. Nach einem Neustart des Prozesses genügt ``pd.read_parquet``
+    statt des deutlich langsameren CSV-Parsings. Fehlt ``pyarrow`` oder ist das
+    Verzeichnis schreibgeschützt, wird einfach die CSV gelesen – der Schnappschuss
+    ist reine Beschleunigung. Debug-Hinweis: Zum Erzwingen eines Neuaufbaus genügt
+    es, den Ordner ``.cache`` zu löschen.
+    """
+
+    kennung = hashlib.sha1(f"{pfad}:{signatur[0]}:{signatur[1]}".encode("utf-8")).hexdigest()[:16]
+    cache_pfad = _PARQUET_CACHE_DIR / f"namensliste_{kennung}.parquet"
+
+    if cache_pfad.exists():
+        try:
+            return pd.read_parquet(cache_pfad, engine="pyarrow")
+        except Exception:
+            pass  # Beschädigter Schnappschuss oder fehlendes pyarrow: CSV als Rückfallebene.
+
+    df = pd.read_csv(pfad, usecols=lambda spalte: spalte in _NAMENSLISTE_SPALTEN)
+    try:
+        _PARQUET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(cache_pfad, engine="pyarrow", compression="zstd", index=False)
+    except Exception:
+        pass  # Ohne Schnappschuss funktioniert alles weiter, nur der Kaltstart bleibt langsamer.
+    return df
+
+
 def prepare_fall_session_state(
     *, namensliste_pfad: str = "Namensliste.csv", namensliste_df: pd.DataFrame | None = None
 ) -> None:
@@ -608,7 +727,10 @@ def prepare_fall_session_state(
 
     if namensliste_df is None:
         try:
-            namensliste_df = pd.read_csv(namensliste_pfad)
+            datei_info = os.stat(namensliste_pfad)
+            namensliste_df = _lade_namensliste(
+                namensliste_pfad, (datei_info.st_mtime_ns, datei_info.st_size)
+            )
         except FileNotFoundError:
             st.error(f"❌ Die Datei '{namensliste_pfad}' wurde nicht gefunden.")
             namensliste_df = pd.DataFrame()
@@ -712,14 +834,27 @@ def prepare_fall_session_state(
         f"Du arbeitest als {st.session_state.patient_job}."
     )
 
-    st.session_state.SYSTEM_PROMPT = f"""
+    # Reihenfolge bewusst von "stabil" nach "individuell": Szenario, Verhalten und
+    # Falldetails sind für viele Sitzungen identisch, Name/Alter/Beruf werden pro
+    # Sitzung ausgelost. OpenAI cacht nur byte-identische Präfixe, daher stehen die
+    # zufälligen Personalien am Ende des System-Prompts.
+    stabiler_praefix = f"""
 Patientensimulation – {st.session_state.diagnose_szenario}
 
-{patient_beschreibung}
 {st.session_state.patient_verhalten}. {st.session_state.patient_hauptanweisung}.
 
 {st.session_state.diagnose_features}
+
 """
+    st.session_state.SYSTEM_PROMPT = f"{stabiler_praefix}{patient_beschreibung}\n"
+
+    # ``prompt_cache_key`` für den Anamnese-Chat: Alle Sitzungen mit demselben stabilen
+    # Präfix (Szenario, Verhalten, Falldetails) erhalten denselben Schlüssel, damit
+    # OpenAI sie bevorzugt auf einen Server leitet, der diesen Präfix bereits im Cache
+    # hat. Ein Schlüssel pro Sitzung würde den gemeinsamen Präfix wieder aufteilen.
+    st.session_state.prompt_cache_key = (
+        "anamnese-" + hashlib.sha256(stabiler_praefix.encode("utf-8")).hexdigest()[:32]
+    )
 
 
 def reset_fall_session_state(keep_keys: Iterable[str] | None = None) -> None:
@@ -772,6 +907,8 @@ def _waehle_fall(df: pd.DataFrame, szenario: str | None) -> pd.Series:
 __all__ = [
     "fallauswahl_prompt",
     "lade_fallbeispiele",
+    "lade_szenario_namen",
+    "leere_fallbeispiel_cache",
     "prepare_fall_session_state",
     "reset_fall_session_state",
     "get_verhaltensoptionen",
@@ -0,0 +1,111 @@
+"""Abschlussfeedback über die OpenAI-Batch-API.
+
+In Lehrveranstaltungen schicken oft Dutzende Studierende ihr Feedback innerhalb
+weniger Minuten ab. Synchrone ``chat.completions``-Aufrufe stoßen dann an die
+Anfragelimits des API-Kontos. Die Batch-API verarbeitet Anfragen dagegen
+asynchron (Zusage: innerhalb von 24 Stunden, in der Praxis meist nach wenigen
+Minuten), hat eigene, deutlich höhere Limits und halbiert die Tokenkosten.
+
+Der Ablauf pro Sitzung:
+
+1. ``reiche_chat_batch_ein`` schreibt die Anfrage als JSONL-Zeile, lädt sie mit
+   ``purpose="batch"`` hoch und startet den Batch. Die Batch-ID liegt danach im
+   SessionState (siehe ``pages/6_Feedback.py``).
+2. ``pruefe_chat_batch`` fragt den Status ab und liefert nach Abschluss den
+   Antworttext samt Tokenverbrauch.
+
+Ob der Batch-Modus aktiv ist, wird im Adminbereich festgelegt und über
+``module.fall_config`` in Supabase persistiert.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+# Endpunkt und Zeitfenster laut OpenAI-Dokumentation. Ein anderes Fenster als
+# "24h" wird von der API derzeit nicht angeboten.
+_BATCH_ENDPUNKT = "/v1/chat/completions"
+_BATCH_ZEITFENSTER = "24h"
+
+# Statuswerte, nach denen kein Ergebnis mehr zu erwarten ist.
+BATCH_ENDSTATUS_FEHLER = frozenset({"failed", "expired", "cancelling", "cancelled"})
+
+
+def reiche_chat_batch_ein(
+    client,
+    *,
+    custom_id: str,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+) -> str:
+    """Startet einen Batch mit genau einer Chat-Anfrage und liefert dessen ID."""
+
+    zeile = {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": _BATCH_ENDPUNKT,
+        "body": {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+        },
+    }
+    inhalt = (json.dumps(zeile, ensure_ascii=False) + "\n").encode("utf-8")
+
+    datei = client.files.create(file=(f"{custom_id}.jsonl", inhalt), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=datei.id,
+        endpoint=_BATCH_ENDPUNKT,
+        completion_window=_BATCH_ZEITFENSTER,
+        metadata={"bereich": "feedback"},
+    )
+    return batch.id
+
+
+def pruefe_chat_batch(
+    client, batch_id: str
+) -> tuple[str, Optional[str], Optional[dict[str, int]]]:
+    """Liefert ``(status, antworttext, usage)`` eines Batches.
+
+    Solange der Batch läuft, sind Text und Usage ``None``. Enthält ein
+    abgeschlossener Batch nur eine Fehlerdatei, wird der Status ``"failed"``
+    zurückgegeben. Debug-Hinweis: Die vollständigen Batch-Details lassen sich mit
+    ``client.batches.retrieve(batch_id).model_dump()`` ausgeben.
+    """
+
+    batch = client.batches.retrieve(batch_id)
+    status = str(batch.status)
+    if status != "completed":
+        return status, None, None
+
+    if not batch.output_file_id:
+        return "failed", None, None
+
+    rohtext = client.files.content(batch.output_file_id).text
+    for zeile in rohtext.splitlines():
+        if not zeile.strip():
+            continue
+        eintrag = json.loads(zeile)
+        body = (eintrag.get("response") or {}).get("body") or {}
+        choices = body.get("choices") or []
+        if not choices:
+            continue
+        text = (choices[0].get("message", {}).get("content") or "").strip()
+        usage_roh = body.get("usage") or {}
+        usage = {
+            "prompt_tokens": int(usage_roh.get("prompt_tokens", 0)),
+            "completion_tokens": int(usage_roh.get("completion_tokens", 0)),
+            "total_tokens": int(usage_roh.get("total_tokens", 0)),
+        }
+        return status, text, usage
+
+    return "failed", None, None
+
+
+__all__ = [
+    "BATCH_ENDSTATUS_FEHLER",
+    "pruefe_chat_batch",
+    "reiche_chat_batch_ein",
+]
@@ -4,10 +4,17 @@ from supabase import create_client, Client
 from cryptography.fernet import Fernet, InvalidToken
 from module.offline import is_offline
 
-# Supabase initialisieren (Erwartung: in st.secrets definiert)
-supabase_url = st.secrets["supabase"]["url"]
-supabase_key = st.secrets["supabase"]["key"]
-supabase: Client = create_client(supabase_url, supabase_key)
+@st.cache_resource(show_spinner=False)
+def _get_supabase_client() -> Client:
+    """Erzeugt den Supabase-Client erst beim ersten Absenden einer Evaluation.
+
+    Zuvor wurde der Client bereits beim Import des Moduls angelegt – also bei jedem
+    ersten Aufruf der Evaluationsseite, auch wenn niemand etwas absendet. Die
+    Zugangsdaten werden weiterhin aus ``st.secrets`` gelesen; fehlen sie, landet der
+    Fehler nun im bestehenden ``except``-Zweig statt die Seite beim Import abzubrechen.
+    """
+
+    return create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
 
 
 def _encrypt_matrikel(matrikel: str) -> str | None:
@@ -102,6 +109,11 @@ def student_feedback():
         }
 
         try:
+            # Das GPT-Feedback wird auf Seite 6 im Hintergrund gespeichert. Vor dem Update
+            # muss dessen Zeilen-ID vorliegen, daher wird hier ggf. auf den Thread gewartet.
+            from module.gpt_feedback import warte_auf_feedback_speicherung
+
+            warte_auf_feedback_speicherung()
             row_id = st.session_state.get("feedback_row_id")
             if row_id is None:
                 # Fallback: versuche den zuletzt angelegten Datensatz zu finden (optional)
@@ -111,7 +123,7 @@ def student_feedback():
                 pass
 
             if row_id is not None:
-                supabase.table("feedback_gpt").update(eintrag).eq("ID", row_id).execute()
+                _get_supabase_client().table("feedback_gpt").update(eintrag).eq("ID", row_id).execute()
                 st.success("✅ Vielen Dank! Ihr Feedback wurde gespeichert.")
                 st.session_state["student_evaluation_done"] = True
                 st.rerun()
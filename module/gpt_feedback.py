@@ -1,15 +1,30 @@
+import random
+import threading
+import time
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 from supabase import create_client
 from datetime import datetime
 # import json
 from module.token_counter import init_token_counters, get_token_sums
 from module.offline import is_offline
 
-def speichere_gpt_feedback_in_supabase():
-    if is_offline():
-        st.info("🔌 Offline-Modus: Feedback wird nicht in Supabase gespeichert.")
-        st.session_state.pop("feedback_row_id", None)
-        return
+# Schlüssel im SessionState, unter dem der laufende Hintergrund-Speichervorgang liegt.
+_SPEICHERUNG_KEY = "feedback_speicherung"
+
+# Wiederholungen für das Einfügen in Supabase. Kurzzeitige Netzwerkfehler sollen nicht
+# dazu führen, dass das Feedback einer ganzen Sitzung verloren geht.
+_MAX_VERSUCHE = 4
+_BASIS_WARTEZEIT_SEKUNDEN = 0.5
+
+
+def _baue_feedback_datensatz() -> dict:
+    """Sammelt alle Werte für die Tabelle ``feedback_gpt`` aus dem SessionState.
+
+    Die Funktion läuft bewusst im Hauptthread: Der Hintergrundthread erhält nur das
+    fertige Dictionary und greift selbst nicht mehr auf ``st.session_state`` zu.
+    """
 
     jetzt = datetime.now()
     start = st.session_state.get("startzeit", jetzt)
@@ -21,22 +36,22 @@ def speichere_gpt_feedback_in_supabase():
 
     # Chatverlauf ohne system-prompt
     patient_name = st.session_state.get("patient_name", "Patient")
-    verlauf = "\n".join([
-        f"Du: {m['content']}" if m['role'] == 'user' else f"{patient_name}: {m['content']}"
+    bezeichnung_nach_rolle = {"user": "Du", "assistant": patient_name}
+    verlauf = "\n".join(
+        f"{bezeichnung_nach_rolle.get(m['role'], patient_name)}: {m['content']}"
         for m in st.session_state.get("messages", [])[1:]
-    ])
+    )
 
     # Befunde aus erster Runde
     befunde = st.session_state.get("befunde", "")
 
-    # Weitere Befunde
-    weitere_befunde = ""
-    gesamt = st.session_state.get("diagnostik_runden_gesamt", 1)
-    for i in range(2, gesamt + 1):
-        bef_key = f"befunde_runde_{i}"
-        inhalt = st.session_state.get(bef_key, "")
-        if inhalt:
-            weitere_befunde += f"\n\n📅 Termin {i}:{inhalt}"
+    # Weitere Befunde (Liste ``befunde_runden``, Index 0 = Termin 2; gepflegt von
+    # ``diagnostikmodul.speichere_folgebefund``)
+    weitere_befunde = "".join(
+        f"\n\n📅 Termin {i}:{inhalt}"
+        for i, inhalt in enumerate(st.session_state.get("befunde_runden", []), start=2)
+        if inhalt
+    )
 
     alle_befunde = befunde + weitere_befunde
 
@@ -64,13 +79,103 @@ def speichere_gpt_feedback_in_supabase():
         "Client": st.session_state.get("feedback_mode", "ChatGPT"),
     }
 
+    return gpt_row
+
+
+def _schreibe_feedback_datensatz(gpt_row: dict, url: str, key: str, ergebnis: dict) -> None:
+    """Fügt den Datensatz mit exponentiellem Backoff in Supabase ein.
+
+    Läuft im Hintergrundthread. Ergebnis (``row_id``) bzw. Fehler landen ausschließlich
+    im übergebenen ``ergebnis``-Dictionary, das der Hauptthread später auswertet.
+    """
+
+    letzter_fehler = None
+    for versuch in range(1, _MAX_VERSUCHE + 1):
+        try:
+            supabase = create_client(url, key)
+            res = supabase.table("feedback_gpt").insert(gpt_row).execute()
+            ergebnis["row_id"] = res.data[0]["ID"]
+            ergebnis["versuche"] = versuch
+            return
+        except Exception as e:
+            letzter_fehler = e
+            if versuch < _MAX_VERSUCHE:
+                wartezeit = _BASIS_WARTEZEIT_SEKUNDEN * (2 ** (versuch - 1))
+                time.sleep(wartezeit + random.uniform(0, wartezeit))
+    ergebnis["fehler"] = letzter_fehler
+    ergebnis["versuche"] = _MAX_VERSUCHE
+
+
+def speichere_gpt_feedback_in_supabase():
+    """Startet das Speichern des GPT-Feedbacks in einem Hintergrundthread.
+
+    Das Feedback wird dadurch sofort angezeigt, während der Supabase-Insert abseits des
+    Renderpfads läuft. Die Zeilen-ID steht erst nach ``warte_auf_feedback_speicherung``
+    als ``feedback_row_id`` im SessionState. Debug-Hinweis: Für eine synchrone
+    Ausführung kann ``_schreibe_feedback_datensatz`` direkt aufgerufen werden.
+    """
+
+    if is_offline():
+        st.info("🔌 Offline-Modus: Feedback wird nicht in Supabase gespeichert.")
+        st.session_state.pop("feedback_row_id", None)
+        return
+
+    if feedback_speicherung_laeuft():
+        return
+
+    gpt_row = _baue_feedback_datensatz()
     try:
-        supabase = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
-        res = supabase.table("feedback_gpt").insert(gpt_row).execute()
-        st.session_state["feedback_row_id"] = res.data[0]["ID"]
-        # gpt_row_serialisiert = json.loads(json.dumps(gpt_row, default=str))
-        # supabase.table("feedback_gpt").insert(gpt_row_serialisiert).execute()
-        # DEBUG 
-        # st.success("✅ GPT-Feedback wurde gespeichert.")
+        url = st.secrets["supabase"]["url"]
+        key = st.secrets["supabase"]["key"]
     except Exception as e:
         st.error(f"🚫 Fehler beim Speichern in Supabase: {repr(e)}")
+        return
+
+    ergebnis: dict = {}
+    thread = threading.Thread(
+        target=_schreibe_feedback_datensatz,
+        args=(gpt_row, url, key, ergebnis),
+        daemon=True,
+    )
+    add_script_run_ctx(thread)
+    st.session_state[_SPEICHERUNG_KEY] = {"thread": thread, "ergebnis": ergebnis}
+    thread.start()
+
+
+def feedback_speicherung_laeuft() -> bool:
+    """Gibt an, ob ein Speichervorgang gestartet und noch nicht ausgewertet wurde."""
+
+    return _SPEICHERUNG_KEY in st.session_state
+
+
+def warte_auf_feedback_speicherung(timeout: float | None = 30.0) -> None:
+    """Wartet auf den Hintergrundthread und übernimmt dessen Ergebnis.
+
+    Nach erfolgreichem Abschluss steht ``feedback_row_id`` im SessionState. Schlägt das
+    Speichern auch nach allen Wiederholungen fehl, erscheint die bisherige Fehlermeldung;
+    der Auftrag wird entfernt, damit beim nächsten Anzeigen ein neuer Versuch startet.
+    """
+
+    auftrag = st.session_state.get(_SPEICHERUNG_KEY)
+    if not auftrag:
+        return
+
+    thread = auftrag["thread"]
+    thread.join(timeout)
+    if thread.is_alive():
+        return  # Noch nicht fertig – beim nächsten Rerun erneut prüfen.
+
+    st.session_state.pop(_SPEICHERUNG_KEY, None)
+    ergebnis = auftrag["ergebnis"]
+    if "row_id" in ergebnis:
+        st.session_state["feedback_row_id"] = ergebnis["row_id"]
+        # DEBUG
+        # st.success(f"✅ GPT-Feedback wurde gespeichert ({ergebnis['versuche']} Versuch(e)).")
+    else:
+        st.error(f"🚫 Fehler beim Speichern in Supabase: {repr(ergebnis.get('fehler'))}")
+
+
+def pruefe_feedback_speicherung() -> None:
+    """Übernimmt das Ergebnis eines bereits beendeten Speichervorgangs ohne zu blockieren."""
+
+    warte_auf_feedback_speicherung(timeout=0)
@@ -0,0 +1,60 @@
+"""Schnelles JSON-Parsen und -Formatieren für die AMBOSS-MCP-Antworten.
+
+AMBOSS liefert oft mehrere Dutzend Kilobyte verschachteltes JSON (teils als JSON in
+JSON), das in ``module/MCP_Amboss.py`` und ``module/amboss_render.py`` mehrfach
+geparst und für die Anzeige wieder formatiert wird. Ist ``orjson`` installiert,
+übernimmt dessen C-Implementierung beides; sonst greift das Standardmodul ``json``
+mit identischem Ergebnis.
+
+Debug-Hinweis: ``JSON_BACKEND`` zeigt, welche Implementierung aktiv ist.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:  # pragma: no cover - optionale Abhängigkeit
+    import orjson
+except Exception:  # pragma: no cover - orjson nicht installiert
+    orjson = None  # type: ignore[assignment]
+
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def json_loads(text: str | bytes) -> Any:
+    """Parst ``text`` als JSON; Fehler werden wie bei ``json.loads`` ausgelöst.
+
+    ``orjson.JSONDecodeError`` ist eine Unterklasse von ``json.JSONDecodeError``,
+    bestehende ``except``-Blöcke greifen daher unverändert.
+    """
+
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def json_dumps_bytes(obj: Any, *, sort_keys: bool = False) -> bytes:
+    """Serialisiert ``obj`` kompakt als UTF-8-Bytes, z. B. als Request-Body.
+
+    Mit ``sort_keys`` ist die Ausgabe unabhängig von der Schlüsselreihenfolge und
+    eignet sich als Grundlage für einen Digest. Nicht serialisierbare Objekte lösen
+    wie bei ``json.dumps`` einen ``TypeError`` aus (``orjson.JSONEncodeError`` ist
+    eine Unterklasse davon).
+    """
+
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys
+    ).encode("utf-8")
+
+
+def json_dumps_pretty(obj: Any) -> str:
+    """Formatiert ``obj`` eingerückt und ohne ASCII-Escaping für die Anzeige."""
+
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
@@ -0,0 +1,350 @@
+"""Persistenter Antwort-Cache für wiederkehrende GPT-Anfragen.
+
+Körperbefunde, Diagnostikbefunde und Feedback entstehen aus Prompts, die sich
+zwischen Sitzungen häufig nur in Leerzeichen unterscheiden (z. B. dasselbe
+Szenario mit identischer Laboranforderung). Statt für jede dieser Anfragen
+erneut mehrere Sekunden auf GPT zu warten, legt dieses Modul die Antworten in
+einer kleinen SQLite-Datenbank ab.
+
+Der Schlüssel ist ein SHA256-Hash aus Bereich, Modell, Temperatur und den
+normalisierten Nachrichten; die Groß-/Kleinschreibung bleibt dabei erhalten.
+Die Datenbank liegt standardmäßig unter
+``~/.karina_cache/`` und wird damit von allen Worker-Prozessen derselben
+Maschine gemeinsam genutzt. Über die Umgebungsvariable ``KARINA_CACHE_DIR``
+lässt sich der Ablageort ändern, ``KARINA_LLM_CACHE=0`` deaktiviert den Cache
+vollständig (hilfreich beim Debuggen neuer Prompts).
+
+Fehler beim Lesen oder Schreiben der Datenbank werden bewusst verschluckt: Der
+Cache ist eine reine Beschleunigung und darf den eigentlichen GPT-Aufruf nie
+verhindern.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from module.openai_client import chat_completion
+from module.single_flight import single_flight
+from module.token_counter import add_usage, init_token_counters
+
+# Gültigkeitsdauer eines Eintrags (7 Tage). Ältere Antworten werden beim Lesen
+# ignoriert und bei jedem Schreibvorgang gelöscht, damit die Datei nicht unbegrenzt
+# wächst und aus Studierendeneingaben abgeleitete Prompts und Feedbacktexte nicht
+# länger als nötig gespeichert bleiben.
+_CACHE_TTL_SEKUNDEN = 7 * 24 * 60 * 60
+
+_CACHE_DATEINAME = "llm_cache.sqlite3"
+
+# Oberhalb dieser Temperatur sind abweichende Antworten ausdrücklich erwünscht.
+# Solche Anfragen werden daher nie aus dem Cache bedient.
+_MAX_CACHE_TEMPERATUR = 0.9
+
+# Mehrfache Leerzeichen, Tabs und Zeilenumbrüche werden für den Schlüssel auf ein
+# einzelnes Leerzeichen reduziert.
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _cache_aktiv() -> bool:
+    """Prüft, ob der Cache über die Umgebungsvariable abgeschaltet wurde."""
+
+    return os.getenv("KARINA_LLM_CACHE", "1").strip().lower() not in {"0", "false", "off", "nein"}
+
+
+def _cache_pfad() -> Path:
+    """Liefert den Pfad der SQLite-Datei und legt das Verzeichnis bei Bedarf an."""
+
+    basis = Path(os.getenv("KARINA_CACHE_DIR") or Path.home() / ".karina_cache")
+    basis.mkdir(parents=True, exist_ok=True)
+    return basis / _CACHE_DATEINAME
+
+
+@contextmanager
+def _verbinde() -> Iterator[sqlite3.Connection]:
+    """Öffnet eine Verbindung zur Cache-Datenbank und stellt das Schema sicher.
+
+    Die Verbindung wird nach jedem Zugriff wieder geschlossen. SQLite kommt mit
+    parallelen Zugriffen mehrerer Prozesse zurecht, solange keine Verbindung
+    dauerhaft offen gehalten wird.
+    """
+
+    conn = sqlite3.connect(_cache_pfad(), timeout=5)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS antworten (
+                schluessel TEXT PRIMARY KEY,
+                inhalt TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                erstellt REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS antworten_erstellt ON antworten (erstellt)")
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def normalisiere_text(text: Any) -> str:
+    """Vereinheitlicht den Leerraum für den Cache-Schlüssel.
+
+    Die Groß-/Kleinschreibung bleibt unverändert: Sonst würde eine für „NSTEMI“
+    erzeugte Antwort auch für „nstemi“ ausgeliefert, obwohl die Eingabe eine andere war.
+    """
+
+    return _WHITESPACE_PATTERN.sub(" ", str(text or "")).strip()
+
+
+def erzeuge_schluessel(
+    *,
+    bereich: str,
+    model: str,
+    temperature: float,
+    messages: Iterable[Mapping[str, Any]],
+) -> str:
+    """Berechnet den SHA256-Schlüssel für eine Anfrage."""
+
+    normalisiert = [
+        [str(msg.get("role", "")), normalisiere_text(msg.get("content"))]
+        for msg in messages
+    ]
+    rohdaten = json.dumps(
+        [bereich, model, round(float(temperature), 3), normalisiert],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(rohdaten.encode("utf-8")).hexdigest()
+
+
+def lade_antwort(schluessel: str) -> Optional[str]:
+    """Liest eine gültige Antwort aus dem Cache oder liefert ``None``."""
+
+    if not _cache_aktiv():
+        return None
+    try:
+        with _verbinde() as conn:
+            zeile = conn.execute(
+                "SELECT inhalt, erstellt FROM antworten WHERE schluessel = ?",
+                (schluessel,),
+            ).fetchone()
+    except (sqlite3.Error, OSError):
+        # Debug-Hinweis: Bei wiederholten Problemen kann hier ein ``print`` ergänzt
+        # werden, um Dateirechte oder Sperren der Datenbank zu prüfen.
+        return None
+    if not zeile:
+        return None
+    inhalt, erstellt = zeile
+    if time.time() - float(erstellt) > _CACHE_TTL_SEKUNDEN:
+        return None
+    return inhalt
+
+
+def speichere_antwort(schluessel: str, inhalt: str, usage: Mapping[str, int] | None = None) -> None:
+    """Legt eine Antwort samt Tokenverbrauch im Cache ab.
+
+    Abgelaufene Einträge werden im selben Zugriff gelöscht (siehe
+    ``_CACHE_TTL_SEKUNDEN``).
+    """
+
+    if not _cache_aktiv() or not inhalt:
+        return
+    jetzt = time.time()
+    try:
+        with _verbinde() as conn:
+            conn.execute(
+                "DELETE FROM antworten WHERE erstellt < ?",
+                (jetzt - _CACHE_TTL_SEKUNDEN,),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO antworten (schluessel, inhalt, usage, erstellt) VALUES (?, ?, ?, ?)",
+                (schluessel, inhalt, json.dumps(dict(usage or {})), jetzt),
+            )
+    except (sqlite3.Error, OSError):
+        # Schreibfehler (z. B. schreibgeschütztes Dateisystem) sind unkritisch –
+        # die Antwort wurde ja bereits erzeugt.
+        pass
+
+
+def cached_chat_completion(
+    client,
+    *,
+    bereich: str,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+    **api_optionen: Any,
+) -> str:
+    """Führt einen Chat-Completion-Aufruf aus und nutzt dabei den Antwort-Cache.
+
+    Bei einem Treffer wird kein Token verbraucht; ``add_usage`` wird daher nur
+    nach einem echten API-Aufruf bedient. Der Rückgabewert ist – wie bei den
+    bisherigen Helfern – der bereinigte Antworttext. Anfragen mit einer
+    Temperatur über ``_MAX_CACHE_TEMPERATUR`` umgehen den Cache vollständig.
+    ``api_optionen`` (z. B. ``response_format``) werden wie bei
+    ``stream_chat_completion`` unverändert durchgereicht und fließen nicht in den
+    Cache-Schlüssel ein.
+    """
+
+    cache_erlaubt = temperature <= _MAX_CACHE_TEMPERATUR
+    schluessel = erzeuge_schluessel(
+        bereich=bereich,
+        model=model,
+        temperature=temperature,
+        messages=messages,
+    )
+    if cache_erlaubt:
+        treffer = lade_antwort(schluessel)
+        if treffer is not None:
+            return treffer
+        # Gleichzeitige identische Anfragen (Doppelklick, paralleler Rerun oder zwei
+        # Sitzungen mit demselben Fall) teilen sich einen einzigen API-Aufruf. Nur der
+        # erste Aufrufer verbraucht Tokens und schreibt den Cache-Eintrag.
+        # ``partial`` bindet die Argumente vorab, damit ``schluessel`` nicht zusätzlich
+        # als Schlüsselwort an ``single_flight`` selbst übergeben wird.
+        return single_flight(
+            schluessel,
+            partial(
+                _frage_gpt,
+                client,
+                schluessel=schluessel,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                cache_erlaubt=True,
+                **api_optionen,
+            ),
+        )
+
+    return _frage_gpt(
+        client,
+        schluessel=schluessel,
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        cache_erlaubt=False,
+        **api_optionen,
+    )
+
+
+def _frage_gpt(
+    client,
+    *,
+    schluessel: str,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+    cache_erlaubt: bool,
+    **api_optionen: Any,
+) -> str:
+    """Führt den eigentlichen API-Aufruf für ``cached_chat_completion`` aus."""
+
+    init_token_counters()
+    response = chat_completion(
+        client,
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        **api_optionen,
+    )
+    usage = {
+        "prompt_tokens": response.usage.prompt_tokens,
+        "completion_tokens": response.usage.completion_tokens,
+        "total_tokens": response.usage.total_tokens,
+    }
+    add_usage(**usage)
+    inhalt = (response.choices[0].message.content or "").strip()
+    if cache_erlaubt:
+        speichere_antwort(schluessel, inhalt, usage)
+    return inhalt
+
+
+def stream_chat_completion(
+    client,
+    *,
+    bereich: str,
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+    nutze_cache: bool = True,
+    **api_optionen: Any,
+) -> Iterator[str]:
+    """Liefert die Antwort als Textfragmente, sobald GPT sie erzeugt.
+
+    Gedacht für ``st.write_stream``: Die ersten Wörter erscheinen nach wenigen
+    hundert Millisekunden statt erst nach der vollständigen Antwort. Bei einem
+    Cache-Treffer wird die gespeicherte Antwort als ein einziges Fragment
+    geliefert. Tokenerfassung und Cache-Eintrag erfolgen, sobald der Stream
+    vollständig gelesen wurde – bricht der Aufrufer vorher ab, wird nichts
+    gespeichert. ``api_optionen`` (z. B. ``extra_body``) werden unverändert an
+    die API durchgereicht und fließen nicht in den Cache-Schlüssel ein.
+
+    Mit ``nutze_cache=False`` wird der Cache weder gelesen noch beschrieben, etwa
+    für Rollenspiel-Antworten, die sich zwischen Sitzungen unterscheiden sollen.
+    """
+
+    cache_erlaubt = nutze_cache and temperature <= _MAX_CACHE_TEMPERATUR
+    schluessel = erzeuge_schluessel(
+        bereich=bereich,
+        model=model,
+        temperature=temperature,
+        messages=messages,
+    )
+    if cache_erlaubt:
+        treffer = lade_antwort(schluessel)
+        if treffer is not None:
+            yield treffer
+            return
+
+    init_token_counters()
+    stream = chat_completion(
+        client,
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        # Ohne ``include_usage`` liefert die API beim Streaming keine Tokenzahlen.
+        # Sie stehen dann im letzten Chunk, der keine ``choices`` mehr enthält.
+        stream_options={"include_usage": True},
+        **api_optionen,
+    )
+
+    teile: list[str] = []
+    usage: dict[str, int] = {}
+    for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage = {
+                "prompt_tokens": chunk.usage.prompt_tokens,
+                "completion_tokens": chunk.usage.completion_tokens,
+                "total_tokens": chunk.usage.total_tokens,
+            }
+        if chunk.choices:
+            fragment = chunk.choices[0].delta.content
+            if fragment:
+                teile.append(fragment)
+                yield fragment
+
+    if usage:
+        add_usage(**usage)
+    inhalt = "".join(teile).strip()
+    if cache_erlaubt:
+        speichere_antwort(schluessel, inhalt, usage)
+
+
+__all__ = [
+    "cached_chat_completion",
+    "erzeuge_schluessel",
+    "lade_antwort",
+    "normalisiere_text",
+    "speichere_antwort",
+    "stream_chat_completion",
+]
@@ -0,0 +1,110 @@
+"""Zentrale Auswahl der OpenAI-Modelle für die einzelnen Anwendungsbereiche.
+
+Bisher stand ``model="gpt-4"`` als Literal in jedem Modul. Damit einzelne
+Bereiche (z. B. der Anamnese-Chat) auf schnellere und günstigere Modelle
+umgestellt werden können, ohne jede Datei anzupassen, wird das Modell hier
+pro Bereich aufgelöst.
+
+Reihenfolge der Auflösung:
+
+1. ``st.session_state["model_variant"]`` – A/B-Test für den Anamnese-Chat.
+   Der Wert kann z. B. im Adminbereich oder per Debug-Snippet gesetzt werden.
+2. ``st.secrets["<bereich>_model"]`` – dauerhafte Übersteuerung pro Bereich,
+   etwa ``chat_model = "gpt-4o"`` oder ``befund_model = "gpt-4o"``.
+3. Die Umgebungsvariable ``KARINA_<BEREICH>_MODEL`` – z. B. ``KARINA_CHAT_MODEL``
+   oder ``KARINA_BEFUND_MODEL`` für lokale Tests ohne ``secrets.toml``.
+4. Der Standardwert aus ``_STANDARD_MODELLE``.
+"""
+
+from __future__ import annotations
+
+import os
+
+import streamlit as st
+
+BEREICH_CHAT = "chat"
+BEREICH_BEFUND = "befund"
+BEREICH_KOERPERBEFUND = "koerperbefund"
+BEREICH_SONDERUNTERSUCHUNG = "sonderuntersuchung"
+BEREICH_SPRACHCHECK = "sprachcheck"
+BEREICH_FEEDBACK = "feedback"
+# Feedback im Modus "AMBOSS + ChatGPT". Ohne eigene Übersteuerung gilt das Modell
+# von ``BEREICH_FEEDBACK``; bei Bedarf kann nur dieser Modus auf ein größeres Modell
+# (z. B. ``feedback_amboss_model = "gpt-4o"``) eskaliert werden.
+BEREICH_FEEDBACK_AMBOSS = "feedback_amboss"
+
+# Der Anamnese-Chat profitiert am stärksten von niedriger Latenz und läuft daher
+# standardmäßig auf ``gpt-4o-mini``. Die Sprachkorrektur nutzt den JSON-Modus
+# (``response_format``), den das klassische ``gpt-4`` nicht unterstützt, und läuft
+# deshalb ebenfalls auf ``gpt-4o-mini``. Die Befunde zu angeforderter Diagnostik
+# folgen einer festen Tabellenvorgabe (siehe ``befundmodul.py``) und liefern mit
+# ``gpt-4o-mini`` vergleichbare Ergebnisse bei deutlich kürzerer Wartezeit. Das
+# Abschlussfeedback bewertet ebenfalls nach einem festen Raster und läuft aus demselben
+# Grund auf ``gpt-4o-mini``. Die übrigen Bereiche bleiben vorerst auf ``gpt-4``, bis
+# die Qualität dort mit kleineren Modellen geprüft wurde.
+_STANDARD_MODELLE: dict[str, str] = {
+    BEREICH_CHAT: "gpt-4o-mini",
+    BEREICH_BEFUND: "gpt-4o-mini",
+    BEREICH_KOERPERBEFUND: "gpt-4",
+    BEREICH_SONDERUNTERSUCHUNG: "gpt-4",
+    BEREICH_SPRACHCHECK: "gpt-4o-mini",
+    BEREICH_FEEDBACK: "gpt-4o-mini",
+}
+
+
+def _lies_secret(schluessel: str) -> str | None:
+    """Liest einen optionalen Eintrag aus ``st.secrets``.
+
+    Lokal fehlt die ``secrets.toml`` mitunter ganz; Streamlit wirft dann bereits
+    beim Zugriff eine Exception. Für die Modellwahl ist das kein Fehlerfall,
+    daher greift in diesem Fall einfach der Standardwert.
+    """
+
+    try:
+        wert = st.secrets.get(schluessel)
+    except Exception:
+        return None
+    if isinstance(wert, str) and wert.strip():
+        return wert.strip()
+    return None
+
+
+def _lies_umgebung(bereich: str) -> str | None:
+    """Liest die optionale Umgebungsvariable ``KARINA_<BEREICH>_MODEL``."""
+
+    wert = os.getenv(f"KARINA_{bereich.upper()}_MODEL", "").strip()
+    return wert or None
+
+
+def get_model(bereich: str) -> str:
+    """Liefert den Modellnamen für den angegebenen Anwendungsbereich."""
+
+    if bereich == BEREICH_CHAT:
+        variante = st.session_state.get("model_variant")
+        if isinstance(variante, str) and variante.strip():
+            return variante.strip()
+
+    if bereich == BEREICH_FEEDBACK_AMBOSS:
+        return (
+            _lies_secret(f"{bereich}_model")
+            or _lies_umgebung(bereich)
+            or get_model(BEREICH_FEEDBACK)
+        )
+
+    return (
+        _lies_secret(f"{bereich}_model")
+        or _lies_umgebung(bereich)
+        or _STANDARD_MODELLE.get(bereich, "gpt-4")
+    )
+
+
+__all__ = [
+    "BEREICH_BEFUND",
+    "BEREICH_CHAT",
+    "BEREICH_FEEDBACK",
+    "BEREICH_FEEDBACK_AMBOSS",
+    "BEREICH_KOERPERBEFUND",
+    "BEREICH_SONDERUNTERSUCHUNG",
+    "BEREICH_SPRACHCHECK",
+    "get_model",
+]
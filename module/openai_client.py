@@ -0,0 +1,116 @@
+"""Gemeinsam genutzter OpenAI-Client für alle Seiten und Sitzungen.
+
+Früher wurde ``OpenAI(...)`` bei jedem Skriptdurchlauf der Startseite neu
+erzeugt. Jede Instanz bringt einen eigenen ``httpx``-Verbindungspool mit, sodass
+TLS-Handshake und DNS-Auflösung bei jedem Rerun erneut anfielen. Über
+``st.cache_resource`` existiert nun genau ein Client pro Prozess, dessen
+Keep-Alive-Verbindungen von allen Sitzungen wiederverwendet werden.
+
+Debug-Hinweis: Nach einem Wechsel des ``OPENAI_API_KEY`` muss der Cache über das
+Streamlit-Menü ("Clear cache") oder ``get_openai_client.clear()`` geleert werden.
+
+Zusätzlich stellt das Modul ``chat_completion`` bzw. ``chat_completion_async``
+bereit. Beide kapseln ``client.chat.completions.create`` mit einem begrenzten,
+zufällig gestreuten exponentiellen Backoff, damit kurzzeitige 429- oder 5xx-Antworten
+nicht sofort als Fehler bei den Studierenden landen.
+"""
+
+from __future__ import annotations
+
+import os
+
+import httpx
+import streamlit as st
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
+
+# Grenzen des Verbindungspools. Sie sind großzügig genug für mehrere parallele
+# Sitzungen (Chat, Befund, Sprachkorrektur) und begrenzen gleichzeitig die Zahl
+# offener Sockets unter Last.
+_MAX_KEEPALIVE_VERBINDUNGEN = 20
+_MAX_VERBINDUNGEN = 40
+_TIMEOUT_SEKUNDEN = 60
+
+# Wiederholungen bei vorübergehenden API-Fehlern. Nach dem letzten Versuch wird die
+# ursprüngliche Exception weitergereicht, sodass bestehende ``except RateLimitError``-
+# Zweige (z. B. im Anamnese-Chat) unverändert greifen. Die Aufrufe laufen im
+# Skript-Thread, während die Oberfläche nur den jeweiligen Spinner zeigt. Die Wartezeit
+# je Wiederholung ist daher knapp bemessen (höchstens 2 × 8 Sekunden), und nach
+# ``_MAX_GESAMTDAUER_SEKUNDEN`` seit dem ersten Versuch wird nicht mehr erneut
+# gesendet – etwa wenn bereits ein Versuch bis zum Timeout gelaufen ist.
+_MAX_VERSUCHE = 3
+_MAX_GESAMTDAUER_SEKUNDEN = 20
+_WARTEZEIT_MIN_SEKUNDEN = 1
+_WARTEZEIT_MAX_SEKUNDEN = 8
+_WIEDERHOLBARE_FEHLER = (
+    RateLimitError,
+    APITimeoutError,
+    APIConnectionError,
+    InternalServerError,
+)
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client() -> OpenAI:
+    """Liefert den prozessweit geteilten OpenAI-Client.
+
+    Die SDK-eigenen Wiederholungen sind abgeschaltet (``max_retries=0``); allein
+    ``chat_completion`` wiederholt fehlgeschlagene Aufrufe. Sonst würde jeder der
+    ``_MAX_VERSUCHE`` Versuche intern bis zu dreimal gesendet und die Obergrenze
+    ``_MAX_GESAMTDAUER_SEKUNDEN`` nicht eingehalten.
+    """
+
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=0,
+        http_client=httpx.Client(
+            limits=httpx.Limits(
+                max_keepalive_connections=_MAX_KEEPALIVE_VERBINDUNGEN,
+                max_connections=_MAX_VERBINDUNGEN,
+            ),
+            timeout=_TIMEOUT_SEKUNDEN,
+        ),
+    )
+
+
+# Debug-Hinweis: Zum Nachvollziehen einzelner Fehlversuche kann ``before_sleep`` mit
+# einer Funktion ergänzt werden, die ``retry_state.outcome.exception()`` ausgibt.
+_wiederhole_bei_api_fehlern = retry(
+    stop=stop_after_attempt(_MAX_VERSUCHE) | stop_after_delay(_MAX_GESAMTDAUER_SEKUNDEN),
+    wait=wait_random_exponential(min=_WARTEZEIT_MIN_SEKUNDEN, max=_WARTEZEIT_MAX_SEKUNDEN),
+    retry=retry_if_exception_type(_WIEDERHOLBARE_FEHLER),
+    reraise=True,
+)
+
+
+@_wiederhole_bei_api_fehlern
+def chat_completion(client, **kwargs):
+    """Ruft ``client.chat.completions.create`` mit Backoff bei vorübergehenden Fehlern auf.
+
+    Bei ``stream=True`` betrifft die Wiederholung nur den Verbindungsaufbau – Fehler
+    treten bei Überlast ohnehin vor dem ersten Chunk auf.
+    """
+
+    return client.chat.completions.create(**kwargs)
+
+
+@_wiederhole_bei_api_fehlern
+async def chat_completion_async(async_client, **kwargs):
+    """Asynchrones Gegenstück zu ``chat_completion`` für ``AsyncOpenAI``."""
+
+    return await async_client.chat.completions.create(**kwargs)
+
+
+__all__ = ["chat_completion", "chat_completion_async", "get_openai_client"]
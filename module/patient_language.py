@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict
 
 import streamlit as st
@@ -93,6 +94,18 @@ def get_patient_forms() -> PatientForms:
     """Ermittelt passende sprachliche Formen anhand des gespeicherten Geschlechts."""
 
     gender = str(st.session_state.get("patient_gender", "")).strip().lower()
+    return _forms_fuer_geschlecht(gender)
+
+
+@lru_cache(maxsize=4)
+def _forms_fuer_geschlecht(gender: str) -> PatientForms:
+    """Baut die Formen je Geschlecht nur einmal pro Prozess auf.
+
+    Es gibt lediglich drei Varianten (``m``, ``w``, neutral). Prompt-Bausteine wie
+    ``generiere_befund`` rufen ``get_patient_forms`` bei jeder Anfrage auf; statt die
+    Dictionaries jedes Mal neu anzulegen, wird die unveränderliche Instanz geteilt.
+    Die enthaltenen Dictionaries dürfen daher nicht verändert werden.
+    """
 
     if gender == "m":
         definite = {
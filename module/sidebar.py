@@ -97,7 +97,7 @@ def show_sidebar():
         st.page_link("pages/1_Anamnese.py", label="Anamnese", icon="💬")
 
 # Nur wenn mind. eine Frage gestellt wurde (Chatverlauf existiert)
-        if "messages" in st.session_state and any(m["role"] == "user" for m in st.session_state["messages"]):
+        if st.session_state.get("user_msg_count", 0) > 0:
             st.page_link("pages/2_Koerperliche_Untersuchung.py", label="Untersuchung", icon="🩺")
     
         # Nur wenn Untersuchung erfolgt ist
@@ -0,0 +1,72 @@
+"""Bündelt gleichzeitige, identische Aufrufe zu einer einzigen Ausführung.
+
+Löst ein Doppelklick oder ein schneller zweiter Rerun dieselbe GPT-Anfrage aus,
+bevor das ``*_generating``-Flag im SessionState sichtbar ist, entstanden bisher
+zwei vollständige API-Aufrufe. Mit ``single_flight`` führt nur der erste Aufrufer
+(„Leader“) die Funktion aus; alle weiteren Aufrufer mit demselben Schlüssel warten
+auf dessen ``Future`` und erhalten dasselbe Ergebnis bzw. dieselbe Exception.
+
+Die Verwaltung liegt prozessweit in einem Modul-Dictionary und gilt damit auch für
+gleichzeitige Anfragen aus verschiedenen Sitzungen (z. B. zwei Studierende mit
+identischem Szenario und identischer Diagnostik).
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Maximale Wartezeit der nachfolgenden Aufrufer. Sie liegt über dem Client-Timeout,
+# damit auch eine langsame, aber erfolgreiche Antwort abgewartet wird.
+_STANDARD_TIMEOUT_SEKUNDEN = 90
+
+_laufende_aufrufe: dict[str, Future] = {}
+_sperre = threading.Lock()
+
+
+def single_flight(
+    schluessel: str,
+    funktion: Callable[..., T],
+    *args: Any,
+    timeout: float = _STANDARD_TIMEOUT_SEKUNDEN,
+    **kwargs: Any,
+) -> T:
+    """Führt ``funktion`` pro Schlüssel höchstens einmal gleichzeitig aus.
+
+    Nachfolgende Aufrufer blockieren bis zu ``timeout`` Sekunden; danach wird
+    ``concurrent.futures.TimeoutError`` ausgelöst und von den bestehenden
+    ``except Exception``-Zweigen der Seiten behandelt.
+    """
+
+    with _sperre:
+        future = _laufende_aufrufe.get(schluessel)
+        ist_leader = future is None
+        if ist_leader:
+            future = Future()
+            _laufende_aufrufe[schluessel] = future
+
+    if not ist_leader:
+        return future.result(timeout=timeout)
+
+    try:
+        ergebnis = funktion(*args, **kwargs)
+    except Exception as err:
+        future.set_exception(err)
+        raise
+    except BaseException:
+        # Streamlit bricht Skriptläufe (Rerun/Stop) über ``BaseException`` ab. Die
+        # wartenden Aufrufer sollen diese Steuerungs-Exception nicht selbst erhalten.
+        future.set_exception(RuntimeError("Die gebündelte Anfrage wurde abgebrochen."))
+        raise
+    else:
+        future.set_result(ergebnis)
+        return ergebnis
+    finally:
+        with _sperre:
+            _laufende_aufrufe.pop(schluessel, None)
+
+
+__all__ = ["single_flight"]
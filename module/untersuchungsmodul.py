@@ -5,6 +5,13 @@ from module.offline import (
     is_offline,
 )
 from module.token_counter import init_token_counters, add_usage
+from module.llm_cache import cached_chat_completion
+from module.openai_client import chat_completion
+from module.llm_config import (
+    BEREICH_KOERPERBEFUND,
+    BEREICH_SONDERUNTERSUCHUNG,
+    get_model,
+)
 
 
 def generiere_koerperbefund(client, diagnose_szenario, diagnose_features, koerper_befund_tip):
@@ -37,24 +44,16 @@ Gib ausschließlich körperliche Untersuchungsbefunde an – keine Bildgebung, L
 Formuliere neutral, präzise und sachlich – so, wie es in einem klinischen Untersuchungsprotokoll stehen würde.
 """
 
-    # Vor dem API-Aufruf initialisieren wir die Token-Zähler, damit auch bei parallelen Aufrufen
-    # keine leeren Strukturen entstehen und die Summen konsistent bleiben.
-    init_token_counters()
-    response = client.chat.completions.create(
-        model="gpt-4",
+    # Der Körperbefund hängt ausschließlich vom Szenario und den Falldaten ab. Wiederholte
+    # Fälle werden daher aus dem Antwort-Cache bedient (siehe ``module/llm_cache.py``). Nur bei
+    # einem Fehltreffer wird GPT kontaktiert und der Tokenverbrauch über ``add_usage`` erfasst.
+    return cached_chat_completion(
+        client,
+        bereich="koerperbefund",
+        model=get_model(BEREICH_KOERPERBEFUND),
         messages=[{"role": "user", "content": prompt}],
-        temperature=0.5
-    )
-    # Damit der Tokenverbrauch jederzeit nachvollziehbar bleibt, addieren wir ihn direkt.
-    # Auch hier gilt: "total_tokens" beschreibt nur diesen einen Call; durch das fortlaufende
-    # Aufsummieren halten wir eine gesamt Sitzungssumme bereit. Für Detailanalysen können bei
-    # Bedarf ergänzende Debug-Ausgaben aktiviert werden.
-    add_usage(
-        prompt_tokens=response.usage.prompt_tokens,
-        completion_tokens=response.usage.completion_tokens,
-        total_tokens=response.usage.total_tokens,
+        temperature=0.5,
     )
-    return response.choices[0].message.content.strip()
 
 
 def generiere_sonderuntersuchung(
@@ -90,8 +89,9 @@ Gib ausschließlich körperliche Untersuchungsbefunde an. Keine Diagnosen, kein
 """
 
     init_token_counters()
-    response = client.chat.completions.create(
-        model="gpt-4",
+    response = chat_completion(
+        client,
+        model=get_model(BEREICH_SONDERUNTERSUCHUNG),
         messages=[{"role": "user", "content": prompt}],
         temperature=0.4,
     )
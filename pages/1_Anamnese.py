@@ -1,6 +1,5 @@
 import streamlit as st
-from openai import OpenAI, RateLimitError
-import os
+from openai import RateLimitError
 from datetime import datetime
 from module.sidebar import show_sidebar
 from module.navigation import redirect_to_start_page
@@ -10,8 +9,10 @@ from module.offline import (
     get_offline_patient_reply,
     is_offline,
 )
-from module.loading_indicator import task_spinner
-from module.token_counter import init_token_counters, add_usage
+from module.chat_verlauf import begrenze_verlauf, sende_fenster
+from module.llm_cache import stream_chat_completion
+from module.llm_config import BEREICH_CHAT, get_model
+from module.openai_client import get_openai_client
 
 copyright_footer()
 show_sidebar()
@@ -21,11 +22,8 @@ display_offline_banner()
 if "SYSTEM_PROMPT" not in st.session_state or "patient_name" not in st.session_state:
     redirect_to_start_page("⚠️ Der Fall ist noch nicht geladen. Bitte beginne über die Startseite.")
 
-# OpenAI-Client initialisieren (nur wenn nicht bereits vorhanden)
-if "openai_client" not in st.session_state:
-    st.session_state["openai_client"] = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-client = st.session_state["openai_client"]
+# Prozessweit geteilter OpenAI-Client (``st.cache_resource``, siehe module/openai_client.py)
+client = get_openai_client()
 
 # Titel
 st.subheader(f"Anamnese - {st.session_state.patient_name}")
@@ -35,6 +33,8 @@ if "startzeit" not in st.session_state:
     st.session_state.startzeit = datetime.now()
 
 # Nachrichtenverlauf initialisieren (außer system-Prompt)
+# System-Prompt und Begrüßung bilden den festen Präfix jedes Chat-Aufrufs. Sie werden
+# nach der Initialisierung nicht mehr verändert, damit der Prompt-Cache von OpenAI greift.
 if "messages" not in st.session_state:
     start_text = "Guten Tag, ich bin froh, dass ich mich heute bei Ihnen vorstellen kann."
     st.session_state.messages = [
@@ -42,55 +42,103 @@ if "messages" not in st.session_state:
         {"role": "assistant", "content": start_text}
     ]
 
-# Nachrichtenverlauf anzeigen (ohne System-Prompt)
-for msg in st.session_state.messages[1:]:
-    sender = st.session_state.patient_name if msg["role"] == "assistant" else "Du"
-    st.markdown(f"**{sender}:** {msg['content']}")
-
-# Eingabeformular
-with st.form(key="eingabe_formular", clear_on_submit=True):
-    user_input = st.text_input(f"Deine Frage an {st.session_state.patient_name}:")
-    submit_button = st.form_submit_button(label="Absenden")
-
-if submit_button and user_input:
-    st.session_state.messages.append({"role": "user", "content": user_input})
-    if is_offline():
-        reply = get_offline_patient_reply(st.session_state.get("patient_name", ""))
-        st.session_state.messages.append({"role": "assistant", "content": reply})
-    else:
-        ladeaufgaben = [
-            "Übermittle Frage an das Sprachmodell",
-            "Warte auf Antwortgenerierung",
-            "Bereite Antwort für die Anzeige auf",
-        ]
-        with task_spinner(f"{st.session_state.patient_name} antwortet...", ladeaufgaben) as indikator:
-            try:
-                indikator.advance(1)
-                # Vor jedem API-Kontakt stellen wir sicher, dass die Zähler existieren,
-                # damit mehrere Chatsitzungen sauber kumuliert werden können.
-                init_token_counters()
-                response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=st.session_state.messages,
-                    temperature=0.6
-                )
-                # Die zurückgelieferten Token-Werte werden unmittelbar in die Session-Summen
-                # übernommen. "total_tokens" enthält zwar bereits die Summe des aktuellen Calls,
-                # dennoch addieren wir explizit, um über mehrere Gesprächsrunden hinweg eine
-                # kumulierte Statistik führen zu können. Für Debugging kann hier bei Bedarf ein
-                # st.write(...) aktiviert werden.
-                add_usage(
-                    prompt_tokens=response.usage.prompt_tokens,
-                    completion_tokens=response.usage.completion_tokens,
-                    total_tokens=response.usage.total_tokens,
-                )
-                indikator.advance(1)
-                reply = response.choices[0].message.content
-                st.session_state.messages.append({"role": "assistant", "content": reply})
-                indikator.advance(1)
-            except RateLimitError:
-                st.error("🚫 Die Anfrage konnte nicht verarbeitet werden, da die OpenAI-API derzeit überlastet ist. Bitte versuchen Sie es in einigen Minuten erneut.")
-    st.rerun()
+# Nach einem Fallwechsel aus dem Adminbereich führt der Weg direkt hierher, ohne die
+# Startseite zu passieren. Daher werden die Fragezähler auch hier abgesichert.
+st.session_state.setdefault("user_msg_count", 0)
+st.session_state.setdefault("user_verlauf_parts", [])
+
+
+@st.fragment
+def chat_fragment() -> None:
+    """Verlauf, Eingabeformular und Antwortgenerierung des Anamnese-Chats.
+
+    Als Fragment läuft nach dem Absenden nur dieser Abschnitt erneut – Seitenleiste,
+    Banner und Fallprüfungen oberhalb bleiben unangetastet. Für Debugging kann der
+    Dekorator entfernt werden; die Funktion verhält sich dann wie zuvor.
+    """
+
+    # Nachrichtenverlauf anzeigen (ohne System-Prompt). ``st.chat_message`` ersetzt die
+    # frühere Darstellung "**Name:** Text" und zeigt beim Patienten das Bild aus der
+    # Seitenleiste als Avatar. Ein "Render-Cursor", der nur neue Nachrichten ausgibt, ist
+    # in Streamlit nicht möglich: Elemente, die in einem Durchlauf nicht erneut erzeugt
+    # werden, verschwinden. Das Fragment begrenzt den Aufwand stattdessen auf den Chat.
+    patient_avatar = st.session_state.get("patient_logo")
+    # Avatar je Rolle einmal vor der Schleife festlegen, statt pro Nachricht zu verzweigen.
+    avatar_nach_rolle = {"user": None, "assistant": patient_avatar}
+    for msg in st.session_state.messages[1:]:
+        with st.chat_message(msg["role"], avatar=avatar_nach_rolle.get(msg["role"])):
+            st.markdown(msg["content"])
+
+    # Platzhalter für die gerade entstehende Antwort. Er liegt bewusst oberhalb des
+    # Formulars, damit die gestreamte Antwort direkt unter dem bisherigen Verlauf erscheint.
+    antwort_bereich = st.container()
+
+    # Eingabeformular
+    with st.form(key="eingabe_formular", clear_on_submit=True):
+        user_input = st.text_input(f"Deine Frage an {st.session_state.patient_name}:")
+        submit_button = st.form_submit_button(label="Absenden")
+
+    if submit_button and user_input:
+        st.session_state.messages.append({"role": "user", "content": user_input})
+        # Zähler und Fragenverlauf werden hier einmalig fortgeschrieben (O(1) statt eines
+        # Durchlaufs über alle Nachrichten bei jedem Rerun in Seitenleiste und Feedback).
+        st.session_state.user_msg_count += 1
+        # Die Fragen werden als Liste gesammelt und erst beim Feedback verbunden; ein
+        # wachsender String müsste bei jedem ``+=`` komplett kopiert werden.
+        st.session_state.user_verlauf_parts.append(user_input)
+        if is_offline():
+            reply = get_offline_patient_reply(st.session_state.get("patient_name", ""))
+            st.session_state.messages.append({"role": "assistant", "content": reply})
+            begrenze_verlauf(st.session_state.messages)
+        else:
+            with antwort_bereich:
+                with st.chat_message("user"):
+                    st.markdown(user_input)
+                with st.chat_message("assistant", avatar=patient_avatar):
+                    # Gemeinsamer Schlüssel aller Sitzungen mit demselben Fallpräfix (siehe
+                    # ``prepare_fall_session_state``). Fehlt er, etwa bei einem älteren
+                    # Session State, läuft die Anfrage ohne Schlüssel.
+                    praefix_schluessel = st.session_state.get("prompt_cache_key")
+                    api_optionen = (
+                        {"extra_body": {"prompt_cache_key": praefix_schluessel}}
+                        if praefix_schluessel
+                        else {}
+                    )
+                    try:
+                        # Die Antwort wird gestreamt: Die ersten Wörter erscheinen nach wenigen
+                        # hundert Millisekunden, statt dass ein Spinner auf die vollständige
+                        # Antwort wartet. Die Tokenerfassung übernimmt ``stream_chat_completion``
+                        # (``module/llm_cache.py``). Der Antwort-Cache bleibt hier bewusst aus:
+                        # Rollenspiel-Antworten (Temperatur 0.6) sollen sich zwischen Sitzungen
+                        # unterscheiden, und jeder Aufruf soll den Präfix-Cache von OpenAI nutzen.
+                        reply = st.write_stream(
+                            stream_chat_completion(
+                                client,
+                                bereich="anamnese",
+                                # Modell laut ``module/llm_config.py`` (Standard: gpt-4o-mini, per
+                                # ``st.secrets["chat_model"]`` oder ``model_variant`` übersteuerbar).
+                                model=get_model(BEREICH_CHAT),
+                                # Nur Präfix und die letzten Nachrichten werden gesendet; der
+                                # vollständige Verlauf bleibt für die Anzeige erhalten.
+                                messages=sende_fenster(st.session_state.messages),
+                                temperature=0.6,
+                                nutze_cache=False,
+                                **api_optionen,
+                            )
+                        )
+                        st.session_state.messages.append({"role": "assistant", "content": str(reply).strip()})
+                        begrenze_verlauf(st.session_state.messages)
+                    except RateLimitError:
+                        st.error("🚫 Die Anfrage konnte nicht verarbeitet werden, da die OpenAI-API derzeit überlastet ist. Bitte versuchen Sie es in einigen Minuten erneut.")
+        # Ab der zweiten Frage genügt ein Rerun des Fragments. Nach der ersten Frage muss
+        # dagegen die ganze Seite neu laufen, weil erst dann der Seitenleisten-Link zur
+        # körperlichen Untersuchung erscheint.
+        if st.session_state.user_msg_count > 1:
+            st.rerun(scope="fragment")
+        st.rerun()
+
+
+chat_fragment()
 
 # Abschlussoption anzeigen
 # st.markdown("---")
@@ -10,6 +10,7 @@ from module.fallverwaltung import (
     fallauswahl_prompt,
     get_verhaltensoptionen,
     lade_fallbeispiele,
+    lade_szenario_namen,
     prepare_fall_session_state,
     reset_fall_session_state,
     speichere_fallbeispiel,
@@ -25,9 +26,11 @@ from module.fall_config import (
     get_amboss_fetch_preferences,
     get_behavior_fix_state,
     get_fall_fix_state,
+    get_feedback_batch_mode,
     get_feedback_mode_fix_info,
     set_amboss_fetch_mode,
     set_amboss_random_probability,
+    set_feedback_batch_mode,
     set_feedback_mode_fix,
     set_fixed_behavior,
     set_fixed_scenario,
@@ -290,6 +293,35 @@ if persisted_active:
 else:
     st.caption("Keine persistente ChatGPT+AMBOSS-Voreinstellung aktiv.")
 
+# Batch-Modus für das Abschlussfeedback. Die Einstellung gilt für alle Sitzungen und
+# wird wie die übrigen Fixierungen in Supabase gespeichert (siehe ``module/fall_config.py``).
+try:
+    batch_aktiv = get_feedback_batch_mode()
+except Exception as err:
+    batch_aktiv = False
+    st.warning(f"Batch-Einstellung konnte nicht gelesen werden: {err}")
+
+batch_toggle = st.toggle(
+    "Feedback über OpenAI-Batch-API erstellen",
+    value=batch_aktiv,
+    help=(
+        "Für Lehrveranstaltungen mit vielen gleichzeitigen Abgaben: Das Feedback wird als "
+        "Batch-Auftrag eingereicht (halbe Tokenkosten, eigene Anfragelimits) und erscheint, "
+        "sobald OpenAI es verarbeitet hat – meist nach wenigen Minuten, spätestens nach 24 Stunden. "
+        "Studierende können jederzeit auf die sofortige Erstellung ausweichen."
+    ),
+    key="admin_feedback_batch_toggle",
+)
+if batch_toggle != batch_aktiv:
+    try:
+        set_feedback_batch_mode(batch_toggle)
+    except Exception as err:
+        st.error(f"Batch-Einstellung konnte nicht gespeichert werden: {err}")
+    else:
+        st.success(
+            "Batch-Modus aktiviert." if batch_toggle else "Batch-Modus deaktiviert – Feedback wird wieder sofort erstellt."
+        )
+
 st.subheader("AMBOSS-Abrufsteuerung")
 st.write(
     "Lege fest, ob der AMBOSS-MCP bei jedem Fall neu kontaktiert wird oder ob die"
@@ -384,9 +416,8 @@ if fall_df.empty:
 elif "Szenario" not in fall_df.columns:
     st.error("Die Fallliste enthält keine Spalte 'Szenario'.")
 else:
-    szenario_options = sorted(
-        {str(s).strip() for s in fall_df["Szenario"].dropna() if str(s).strip()}
-    )
+    # Die bereinigte Namensmenge liegt bereits im Cache (siehe ``lade_szenario_namen``).
+    szenario_options = sorted(lade_szenario_namen())
 
     if not szenario_options:
         st.info("In der Datei wurden keine Szenarien gefunden.")
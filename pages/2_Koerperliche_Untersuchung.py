@@ -11,6 +11,8 @@ from module.sidebar import show_sidebar
 from module.footer import copyright_footer
 from module.offline import display_offline_banner, is_offline
 from module.loading_indicator import task_spinner
+from module.openai_client import get_openai_client
+from diagnostikmodul import folgebefunde
 
 copyright_footer()
 show_sidebar()
@@ -24,11 +26,8 @@ st.session_state.setdefault("sonder_untersuchung_generating", False)
 # (hier: bewusst leer) und wir vermeiden Fehlermeldungen durch späte Zuweisungen.
 st.session_state.setdefault("sonderuntersuchung_input", "")
 
-# Falls ein vorheriger Durchlauf das Textfeld gezielt leeren wollte, wird dies
-# hier umgesetzt. Die Pop-Operation erfolgt vor der Widget-Instanziierung,
-# damit Streamlit keine Mutation eines bereits existierenden Widgets meldet.
-if st.session_state.pop("sonderuntersuchung_input_leeren", False):
-    st.session_state["sonderuntersuchung_input"] = ""
+# Das gezielte Leeren des Textfelds nach einer Anforderung übernimmt
+# ``befund_und_sonderuntersuchung_fragment`` (siehe dort).
 
 
 def aktualisiere_befundanzeige() -> None:
@@ -54,10 +53,10 @@ def aktualisiere_sonderdiagnostik_prefix() -> None:
         if erster_befund:
             passagen.append(f"### Termin 1\n{erster_befund}")
 
-        gesamt = st.session_state.get("diagnostik_runden_gesamt", 1)
-        for termin in range(2, gesamt + 1):
-            key = f"befunde_runde_{termin}"
-            text = st.session_state.get(key, "").strip()
+        # Folgetermine stammen aus der Liste ``befunde_runden`` (siehe ``folgebefunde``)
+        # statt aus einzeln nachgeschlagenen ``befunde_runde_<n>``-Schlüsseln.
+        for termin, befund in enumerate(folgebefunde(), start=2):
+            text = befund.strip()
             if text:
                 passagen.append(f"### Termin {termin}\n{text}")
 
@@ -148,16 +147,23 @@ if (
 ):
     redirect_to_start_page("⚠️ Der Fall ist noch nicht geladen. Bitte beginne über die Startseite.")
 
-# Optional: Startzeit merken (z. B. für spätere Auswertung)
-if "start_untersuchung" not in st.session_state:
-    st.session_state.start_untersuchung = datetime.now()
 
-# Körperlicher Befund generieren oder anzeigen
+@st.fragment
+def befund_und_sonderuntersuchung_fragment() -> None:
+    """Zeigt den Körperbefund an und nimmt Zusatzuntersuchungen entgegen.
 
-# Bedingung: mindestens eine Anamnesefrage gestellt
-fragen_gestellt = any(m["role"] == "user" for m in st.session_state.get("messages", []))
+    Als Fragment führt das Absenden einer Zusatzuntersuchung nur diesen Abschnitt
+    erneut aus, nicht die gesamte Seite samt Seitenleiste.
+    """
+
+    # Falls ein vorheriger Durchlauf das Textfeld gezielt leeren wollte, wird dies
+    # hier umgesetzt. Die Pop-Operation erfolgt vor der Widget-Instanziierung,
+    # damit Streamlit keine Mutation eines bereits existierenden Widgets meldet.
+    # Sie liegt innerhalb des Fragments, weil bei einem Fragment-Rerun der
+    # Seitenkopf nicht erneut ausgeführt wird.
+    if st.session_state.pop("sonderuntersuchung_input_leeren", False):
+        st.session_state["sonderuntersuchung_input"] = ""
 
-if "koerper_befund" in st.session_state:
     # Bei jedem Seitenaufruf wird der Text aus Basis + Zusätzen neu zusammengesetzt,
     # damit nach einer Rerun-Operation keine veralteten Abschnitte sichtbar bleiben.
     aktualisiere_befundanzeige()
@@ -183,7 +189,7 @@ if "koerper_befund" in st.session_state:
             try:
                 if is_offline():
                     sonder_befund = generiere_sonderuntersuchung(
-                        st.session_state.get("openai_client"),
+                        get_openai_client(),
                         st.session_state.diagnose_szenario,
                         st.session_state.diagnose_features,
                         sonder_input,
@@ -201,7 +207,7 @@ if "koerper_befund" in st.session_state:
                     ) as indikator:
                         indikator.advance(1)
                         sonder_befund = generiere_sonderuntersuchung(
-                            st.session_state["openai_client"],
+                            get_openai_client(),
                             st.session_state.diagnose_szenario,
                             st.session_state.diagnose_features,
                             sonder_input,
@@ -224,7 +230,9 @@ if "koerper_befund" in st.session_state:
                 # wird das Feld vor der Widget-Erstellung geleert.
                 st.session_state["sonderuntersuchung_input_leeren"] = True
                 st.success("Die gesonderte Untersuchung wurde ergänzt.")
-                st.rerun()
+                # Nur das Fragment muss neu laufen: Seitenleiste und Navigation ändern
+                # sich durch eine Zusatzuntersuchung nicht.
+                st.rerun(scope="fragment")
             except RateLimitError:
                 st.session_state["sonder_untersuchung_generating"] = False
                 st.error(
@@ -235,13 +243,25 @@ if "koerper_befund" in st.session_state:
                 st.error(f"❌ Fehler bei der Zusatzuntersuchung: {err}")
                 # Debug-Hinweis: Bei Bedarf kann hier temporär st.exception(err) aktiviert werden.
 
+
+# Optional: Startzeit merken (z. B. für spätere Auswertung)
+if "start_untersuchung" not in st.session_state:
+    st.session_state.start_untersuchung = datetime.now()
+
+# Körperlicher Befund generieren oder anzeigen
+
+# Bedingung: mindestens eine Anamnesefrage gestellt
+fragen_gestellt = st.session_state.get("user_msg_count", 0) > 0
+
+if "koerper_befund" in st.session_state:
+    befund_und_sonderuntersuchung_fragment()
 elif fragen_gestellt:
     if not st.session_state.get("koerper_befund_generating", False):
         st.session_state.koerper_befund_generating = True
         try:
             if is_offline():
                 koerper_befund = generiere_koerperbefund(
-                    st.session_state.get("openai_client"),
+                    get_openai_client(),
                     st.session_state.diagnose_szenario,
                     st.session_state.diagnose_features,
                     st.session_state.get("koerper_befund_tip", ""),
@@ -264,7 +284,7 @@ elif fragen_gestellt:
                 ) as indikator:
                     indikator.advance(1)
                     koerper_befund = generiere_koerperbefund(
-                        st.session_state["openai_client"],
+                        get_openai_client(),
                         st.session_state.diagnose_szenario,
                         st.session_state.diagnose_features,
                         st.session_state.get("koerper_befund_tip", ""),
@@ -297,7 +317,7 @@ elif fragen_gestellt:
         try:
             if is_offline():
                 koerper_befund = generiere_koerperbefund(
-                    st.session_state.get("openai_client"),
+                    get_openai_client(),
                     st.session_state.diagnose_szenario,
                     st.session_state.diagnose_features,
                     st.session_state.get("koerper_befund_tip", "")
@@ -318,7 +338,7 @@ elif fragen_gestellt:
                 ) as indikator:
                     indikator.advance(1)
                     koerper_befund = generiere_koerperbefund(
-                        st.session_state["openai_client"],
+                        get_openai_client(),
                         st.session_state.diagnose_szenario,
                         st.session_state.diagnose_features,
                         st.session_state.get("koerper_befund_tip", "")
@@ -2,10 +2,16 @@ import streamlit as st
 from module.sidebar import show_sidebar
 from module.navigation import redirect_to_start_page
 from module.footer import copyright_footer
-from diagnostikmodul import diagnostik_und_befunde_routine
+from diagnostikmodul import (
+    diagnostik_und_befunde_routine,
+    folgebefunde,
+    speichere_folgebefund,
+)
 from befundmodul import generiere_befund
+from sprachmodul import sprach_check_batch
 from module.offline import display_offline_banner, is_offline
 from module.loading_indicator import task_spinner
+from module.openai_client import get_openai_client
 
 show_sidebar()
 display_offline_banner()
@@ -27,11 +33,11 @@ def aktualisiere_kumulative_befunde_page(neuer_befund: str) -> None:
 
     st.session_state["befunde"] = neuer_befund
 
+    # Die Folgebefunde liegen bereits als Liste vor (siehe ``folgebefunde``); einzelne
+    # ``befunde_runde_<n>``-Schlüssel müssen dafür nicht mehr nachgeschlagen werden.
     passagen = [f"### Termin 1\n{neuer_befund}".strip()]
-    gesamt = st.session_state.get("diagnostik_runden_gesamt", 1)
-    for termin in range(2, gesamt + 1):
-        key = f"befunde_runde_{termin}"
-        text = st.session_state.get(key, "").strip()
+    for termin, befund in enumerate(folgebefunde(), start=2):
+        text = befund.strip()
         if text:
             passagen.append(f"### Termin {termin}\n{text}")
 
@@ -98,17 +104,21 @@ if "koerper_befund" in st.session_state:
                     submitted_diag = st.form_submit_button("✅ Eingaben speichern")
         
                 if submitted_diag:
-                    from sprachmodul import sprach_check
-                    client = st.session_state.get("openai_client")
-                    st.session_state.user_ddx2 = sprach_check(ddx_input2, client)
-                    st.session_state.user_diagnostics = sprach_check(diag_input2, client)
+                    client = get_openai_client()
+                    # Beide Eingaben werden in einem einzigen GPT-Aufruf korrigiert (JSON-Antwort).
+                    # Scheitert das Parsing, fällt ``sprach_check_batch`` automatisch auf
+                    # parallele Einzelaufrufe zurück.
+                    (
+                        st.session_state.user_ddx2,
+                        st.session_state.user_diagnostics,
+                    ) = sprach_check_batch([ddx_input2, diag_input2], client)
                     starte_automatische_befundgenerierung_page(client)
 
         else:
                 st.markdown(f"**Differentialdiagnosen:**  \n{st.session_state.user_ddx2}")
                 st.markdown(f"**Diagnostische Maßnahmen:**  \n{st.session_state.user_diagnostics}")
 
-        starte_automatische_befundgenerierung_page(st.session_state.get("openai_client"))
+        starte_automatische_befundgenerierung_page(get_openai_client())
 else:
     st.subheader("Diagnostik und Befunde")
     st.button("Untersuchung durchführen", disabled=True)
@@ -137,7 +147,7 @@ if (
                 f"{st.session_state['befund_generierungsfehler']}"
             )
         if st.session_state.get("befund_generierung_gescheitert", False):
-            client = st.session_state.get("openai_client")
+            client = get_openai_client()
             if st.button("🧪 Befunde generieren lassen"):
                 try:
                     st.session_state["befund_generating"] = True
@@ -184,85 +194,97 @@ else:
     # st.info("❗Bitte fordern Sie zunächst Untersuchungen an.")
     pass  # Bewusst keine Ausgabe: Kommentare oben erläutern die Hintergründe für Debugging-Zwecke.
 
-# Weitere Diagnostik-Termine
-if not st.session_state.get("final_diagnose", "").strip():
-    if (
-        "diagnostik_eingaben" not in st.session_state
-        or "gpt_befunde" not in st.session_state
-        or st.session_state.get("diagnostik_aktiv", False)
-    ):
-        client = st.session_state.get("openai_client")
-        diagnostik_eingaben, gpt_befunde = diagnostik_und_befunde_routine(
-            client,
-            start_runde=2,
-            weitere_diagnostik_aktiv=False
-        )
-        st.session_state["diagnostik_eingaben"] = diagnostik_eingaben
-        st.session_state["gpt_befunde"] = gpt_befunde
-    else:
-        diagnostik_eingaben = st.session_state["diagnostik_eingaben"]
-        gpt_befunde = st.session_state["gpt_befunde"]
 
-    # Anzeige bestehender Befunde
+@st.fragment
+def weitere_diagnostik_fragment() -> None:
+    """Folgetermine: bisherige Befunde, Formular für neue Diagnostik und Anforderungsbutton.
+
+    Der Abschnitt hängt nur von seinen eigenen Session-State-Werten ab. Als
+    Fragment lösen "Weitere Diagnostik anfordern" und das Absenden eines neuen
+    Termins daher keinen Rerun der gesamten Seite mehr aus.
+    """
+
+    # Weitere Diagnostik-Termine
+    if not st.session_state.get("final_diagnose", "").strip():
+        if (
+            "diagnostik_eingaben" not in st.session_state
+            or "gpt_befunde" not in st.session_state
+            or st.session_state.get("diagnostik_aktiv", False)
+        ):
+            client = get_openai_client()
+            diagnostik_eingaben, gpt_befunde = diagnostik_und_befunde_routine(
+                client,
+                start_runde=2,
+                weitere_diagnostik_aktiv=False
+            )
+            st.session_state["diagnostik_eingaben"] = diagnostik_eingaben
+            st.session_state["gpt_befunde"] = gpt_befunde
+        else:
+            diagnostik_eingaben = st.session_state["diagnostik_eingaben"]
+            gpt_befunde = st.session_state["gpt_befunde"]
+
+        # Anzeige bestehender Befunde
+        # Die Folgebefunde liegen als Liste vor (siehe ``folgebefunde``); pro Rerun fällt
+        # damit kein Zusammensetzen und Nachschlagen einzelner Rundenschlüssel mehr an.
+        for i, bef in enumerate(folgebefunde(), start=2):
+            if bef:
+                st.markdown(f"📅 Termin {i}")
+                st.markdown(bef)
+
+    # Zusätzlicher Termin
     gesamt = st.session_state.get("diagnostik_runden_gesamt", 1)
-    for i in range(2, gesamt + 1):
-        bef_key = f"befunde_runde_{i}"
-        bef = st.session_state.get(bef_key, "")
-        if bef:
-            st.markdown(f"📅 Termin {i}")
-            st.markdown(bef)
+    neuer_termin = gesamt + 1
 
-# Zusätzlicher Termin
-gesamt = st.session_state.get("diagnostik_runden_gesamt", 1)
-neuer_termin = gesamt + 1
+    if (
+        st.session_state.get("diagnostik_aktiv", False)
+        and f"diagnostik_runde_{neuer_termin}" not in st.session_state
+    ):
+        st.markdown(f"### 📅 Termin {neuer_termin}")
+        with st.form(key=f"diagnostik_formular_runde_{neuer_termin}_hauptskript"):
+            neue_diagnostik = st.text_area(
+                "Welche zusätzlichen diagnostischen Maßnahmen möchten Sie anfordern?",
+                key=f"eingabe_diag_r{neuer_termin}"
+            )
+            submitted = st.form_submit_button("✅ Diagnostik anfordern")
 
-if (
-    st.session_state.get("diagnostik_aktiv", False)
-    and f"diagnostik_runde_{neuer_termin}" not in st.session_state
-):
-    st.markdown(f"### 📅 Termin {neuer_termin}")
-    with st.form(key=f"diagnostik_formular_runde_{neuer_termin}_hauptskript"):
-        neue_diagnostik = st.text_area(
-            "Welche zusätzlichen diagnostischen Maßnahmen möchten Sie anfordern?",
-            key=f"eingabe_diag_r{neuer_termin}"
-        )
-        submitted = st.form_submit_button("✅ Diagnostik anfordern")
-
-    if submitted and neue_diagnostik.strip():
-        neue_diagnostik = neue_diagnostik.strip()
-        st.session_state[f"diagnostik_runde_{neuer_termin}"] = neue_diagnostik
+        if submitted and neue_diagnostik.strip():
+            neue_diagnostik = neue_diagnostik.strip()
+            st.session_state[f"diagnostik_runde_{neuer_termin}"] = neue_diagnostik
 
-        szenario = st.session_state.get("diagnose_szenario", "")
-        client = st.session_state.get("openai_client")
-        if is_offline():
-            befund = generiere_befund(client, szenario, neue_diagnostik)
-            st.session_state[f"befunde_runde_{neuer_termin}"] = befund
-        else:
-            ladeaufgaben = [
-                "Übertrage neue Diagnostik an das Modell",
-                "Stimme Ergebnisse mit bisherigen Befunden ab",
-                "Bereite Rückmeldung für die Anzeige auf",
-            ]
-            with task_spinner("GPT erstellt Befunde...", ladeaufgaben) as indikator:
-                indikator.advance(1)
+            szenario = st.session_state.get("diagnose_szenario", "")
+            client = get_openai_client()
+            if is_offline():
                 befund = generiere_befund(client, szenario, neue_diagnostik)
-                indikator.advance(1)
-                st.session_state[f"befunde_runde_{neuer_termin}"] = befund
-                indikator.advance(1)
-        st.session_state["diagnostik_runden_gesamt"] = neuer_termin
-        st.session_state["diagnostik_aktiv"] = False
-        if is_offline():
-            st.info("🔌 Offline-Befund gespeichert. Schalte den Online-Modus wieder ein, um echte GPT-Ergebnisse zu erhalten.")
-        st.rerun()
+                speichere_folgebefund(neuer_termin, befund)
+            else:
+                ladeaufgaben = [
+                    "Übertrage neue Diagnostik an das Modell",
+                    "Stimme Ergebnisse mit bisherigen Befunden ab",
+                    "Bereite Rückmeldung für die Anzeige auf",
+                ]
+                with task_spinner("GPT erstellt Befunde...", ladeaufgaben) as indikator:
+                    indikator.advance(1)
+                    befund = generiere_befund(client, szenario, neue_diagnostik)
+                    indikator.advance(1)
+                    speichere_folgebefund(neuer_termin, befund)
+                    indikator.advance(1)
+            st.session_state["diagnostik_runden_gesamt"] = neuer_termin
+            st.session_state["diagnostik_aktiv"] = False
+            if is_offline():
+                st.info("🔌 Offline-Befund gespeichert. Schalte den Online-Modus wieder ein, um echte GPT-Ergebnisse zu erhalten.")
+            st.rerun(scope="fragment")
+
+    # Button für neue Diagnostik
+    if (
+        not st.session_state.get("diagnostik_aktiv", False)
+        and ("befunde" in st.session_state or gesamt >= 2)
+    ):
+        if st.button("➕ Weitere Diagnostik anfordern", key="btn_neue_diagnostik"):
+            st.session_state["diagnostik_aktiv"] = True
+            st.rerun(scope="fragment")
 
-# Button für neue Diagnostik
-if (
-    not st.session_state.get("diagnostik_aktiv", False)
-    and ("befunde" in st.session_state or gesamt >= 2)
-):
-    if st.button("➕ Weitere Diagnostik anfordern", key="btn_neue_diagnostik"):
-        st.session_state["diagnostik_aktiv"] = True
-        st.rerun()
+
+weitere_diagnostik_fragment()
 
 # # Nur für Admin sichtbar:
 # if st.session_state.get("admin_mode"):
@@ -1,9 +1,10 @@
 import streamlit as st
 from module.sidebar import show_sidebar
 from module.navigation import redirect_to_start_page
-from sprachmodul import sprach_check
+from sprachmodul import sprach_check_batch
 from module.footer import copyright_footer
 from module.offline import display_offline_banner, is_offline
+from module.openai_client import get_openai_client
 
 show_sidebar()
 display_offline_banner()
@@ -27,9 +28,13 @@ else:
         submitted_final = st.form_submit_button("✅ Senden")
 
     if submitted_final:
-        client = st.session_state.get("openai_client")
-        st.session_state.final_diagnose = sprach_check(input_diag, client)
-        st.session_state.therapie_vorschlag = sprach_check(input_therapie, client)
+        client = get_openai_client()
+        # Diagnose und Therapiekonzept werden in einem gemeinsamen GPT-Aufruf korrigiert
+        # (JSON-Modus, siehe ``sprach_check_batch``) statt in zwei getrennten Roundtrips.
+        (
+            st.session_state.final_diagnose,
+            st.session_state.therapie_vorschlag,
+        ) = sprach_check_batch([input_diag, input_therapie], client)
         if is_offline():
             st.info("🔌 Offline-Modus: Eingaben wurden ohne GPT-Korrektur übernommen.")
         st.rerun()
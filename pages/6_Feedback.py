@@ -8,13 +8,11 @@ Studierenden erfolgt auf der nachgelagerten Seite `7_Evaluation_und_Download.py`
 import streamlit as st
 
 from diagnostikmodul import aktualisiere_diagnostik_zusammenfassung
-from feedbackmodul import feedback_erzeugen
 from module.footer import copyright_footer
-from module.gpt_feedback import speichere_gpt_feedback_in_supabase
-from module.loading_indicator import task_spinner
 from module.navigation import redirect_to_start_page
 from module.offline import display_offline_banner, is_offline
 from module.sidebar import show_sidebar
+from module.openai_client import get_openai_client
 
 
 # Die Sidebar und der Footer werden identisch zu den übrigen Seiten dargestellt, damit
@@ -53,6 +51,18 @@ def _generiere_feedback() -> str:
     if feedback_text:
         return feedback_text
 
+    # Läuft bereits ein Batch-Auftrag, übernimmt ``_batch_status_fragment`` die Abfrage.
+    if st.session_state.get("feedback_batch_id"):
+        return ""
+
+    # Das Feedbackmodul wird erst benötigt, wenn tatsächlich generiert wird. Bei jedem
+    # weiteren Rerun (Feedback liegt bereits vor) entfällt der Import vollständig.
+    from feedbackmodul import (
+        feedback_erzeugen,
+        feedback_erzeugen_stream,
+        feedback_json_modus_aktiv,
+    )
+
     diagnostik_eingaben = st.session_state.get("diagnostik_eingaben_kumuliert", "")
     gpt_befunde = st.session_state.get("gpt_befunde_kumuliert", "")
     koerper_befund = st.session_state.get("koerper_befund", "")
@@ -60,51 +70,143 @@ def _generiere_feedback() -> str:
     therapie_vorschlag = st.session_state.get("therapie_vorschlag", "")
     diagnose_szenario = st.session_state.get("diagnose_szenario", "")
     user_ddx2 = st.session_state.get("user_ddx2", "")
-    user_verlauf = "\n".join(
-        msg["content"] for msg in st.session_state.get("messages", []) if msg["role"] == "user"
-    )
+    # Die Fragen werden im Chat beim Absenden gesammelt (siehe 1_Anamnese.py) und hier
+    # einmalig verbunden.
+    user_verlauf = "\n".join(st.session_state.get("user_verlauf_parts", []))
     anzahl_termine = st.session_state.get("diagnostik_runden_gesamt", 1)
 
+    feedback_argumente = (
+        final_diagnose,
+        therapie_vorschlag,
+        user_ddx2,
+        diagnostik_eingaben,
+        gpt_befunde,
+        koerper_befund,
+        user_verlauf,
+        anzahl_termine,
+        diagnose_szenario,
+    )
+    if not is_offline() and _batch_modus_aktiv():
+        _reiche_feedback_batch_ein(feedback_argumente)
+        return ""
+
     if is_offline():
-        feedback = feedback_erzeugen(
-            st.session_state.get("openai_client"),
-            final_diagnose,
-            therapie_vorschlag,
-            user_ddx2,
-            diagnostik_eingaben,
-            gpt_befunde,
-            koerper_befund,
-            user_verlauf,
-            anzahl_termine,
-            diagnose_szenario,
-        )
+        feedback = feedback_erzeugen(get_openai_client(), *feedback_argumente)
+        st.session_state.final_feedback = feedback
+    elif feedback_json_modus_aktiv():
+        # Im JSON-Modus (``KARINA_FEEDBACK_JSON=1``) kommt die Antwort als Ganzes und
+        # wird erst danach zu Markdown zusammengesetzt; Streaming ist hier nicht möglich.
+        with st.spinner("⏳ Abschluss-Feedback wird erstellt..."):
+            feedback = feedback_erzeugen(get_openai_client(), *feedback_argumente)
         st.session_state.final_feedback = feedback
     else:
-        ladeaufgaben = [
-            "Sammle relevante Falldaten",
-            "Analysiere Antworten der Studierenden",
-            "Formuliere individualisiertes Feedback",
-        ]
-        with task_spinner("⏳ Abschluss-Feedback wird erstellt...", ladeaufgaben) as indikator:
-            indikator.advance(1)
-            feedback = feedback_erzeugen(
-                st.session_state["openai_client"],
-                final_diagnose,
-                therapie_vorschlag,
-                user_ddx2,
-                diagnostik_eingaben,
-                gpt_befunde,
-                koerper_befund,
-                user_verlauf,
-                anzahl_termine,
-                diagnose_szenario,
-            )
-            indikator.advance(1)
-            st.session_state.final_feedback = feedback
-            indikator.advance(1)
+        # Das Feedback wird gestreamt: Die ersten Sätze erscheinen nach kurzer Zeit,
+        # statt dass ein Spinner auf den vollständigen Text wartet. Anschließend läuft
+        # die Seite einmal neu und zeigt das gespeicherte Feedback regulär über
+        # ``_zeige_feedback`` an (inkl. Supabase-Speicherung).
+        st.subheader("📋 Automatisches Feedback")
+        feedback = st.write_stream(
+            feedback_erzeugen_stream(get_openai_client(), *feedback_argumente)
+        )
+        st.session_state.final_feedback = str(feedback).strip()
+        _setze_evaluation_zurueck()
+        st.rerun()
+    _setze_evaluation_zurueck()
+    return feedback
+
+
+def _setze_evaluation_zurueck() -> None:
+    """Bereitet Evaluation und Supabase-Speicherung für ein neues Feedback vor."""
+
     st.session_state["student_evaluation_done"] = False
     st.session_state.pop("feedback_row_id", None)
-    return feedback
+    # Ein noch laufender Speichervorgang gehört zum vorherigen Feedback und wird verworfen.
+    st.session_state.pop("feedback_speicherung", None)
+
+
+def _batch_modus_aktiv() -> bool:
+    """Prüft, ob das Feedback über die Batch-API erstellt werden soll.
+
+    Der Schalter liegt im Adminbereich und wird in Supabase persistiert. Ist die
+    Einstellung nicht lesbar oder wurde für diese Sitzung die Sofort-Erstellung
+    gewählt, bleibt es beim synchronen Aufruf.
+    """
+
+    if st.session_state.get("feedback_batch_sofort"):
+        return False
+    try:
+        from module.fall_config import get_feedback_batch_mode
+
+        return get_feedback_batch_mode()
+    except Exception:
+        return False
+
+
+def _reiche_feedback_batch_ein(feedback_argumente: tuple) -> None:
+    """Reicht den Feedback-Prompt als Batch-Auftrag ein und merkt sich die Batch-ID."""
+
+    import uuid
+
+    from feedbackmodul import baue_feedback_nachrichten, feedback_modell
+    from module.feedback_batch import reiche_chat_batch_ein
+
+    sitzung = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    try:
+        batch_id = reiche_chat_batch_ein(
+            get_openai_client(),
+            custom_id=f"feedback-{sitzung}",
+            model=feedback_modell(),
+            messages=baue_feedback_nachrichten(*feedback_argumente),
+            temperature=0.4,
+        )
+    except Exception as err:
+        # Scheitert bereits das Einreichen, wird das Feedback direkt synchron erzeugt.
+        st.warning(f"⚠️ Batch-Auftrag konnte nicht angelegt werden ({err}). Das Feedback wird sofort erstellt.")
+        st.session_state["feedback_batch_sofort"] = True
+        st.rerun()
+    st.session_state["feedback_batch_id"] = batch_id
+
+
+@st.fragment(run_every=60)
+def _batch_status_fragment() -> None:
+    """Fragt den Batch-Auftrag minütlich ab und übernimmt das fertige Feedback."""
+
+    from module.feedback_batch import BATCH_ENDSTATUS_FEHLER, pruefe_chat_batch
+    from module.token_counter import add_usage, init_token_counters
+
+    batch_id = st.session_state.get("feedback_batch_id")
+    if not batch_id:
+        return
+
+    try:
+        status, text, usage = pruefe_chat_batch(get_openai_client(), batch_id)
+    except Exception as err:
+        st.warning(f"⚠️ Der Status des Batch-Auftrags konnte nicht abgefragt werden: {err}")
+        return
+
+    if text:
+        init_token_counters()
+        add_usage(**usage)
+        st.session_state.pop("feedback_batch_id", None)
+        st.session_state.final_feedback = text
+        _setze_evaluation_zurueck()
+        st.rerun()
+
+    if status in BATCH_ENDSTATUS_FEHLER:
+        st.session_state.pop("feedback_batch_id", None)
+        st.session_state["feedback_batch_sofort"] = True
+        st.warning(f"⚠️ Der Batch-Auftrag ist mit Status „{status}“ beendet. Das Feedback wird sofort erstellt.")
+        st.rerun()
+
+    st.info(
+        f"⏳ Dein Feedback wird im Batch-Verfahren erstellt (Status: {status}). "
+        "Die Seite prüft jede Minute automatisch, ob es vorliegt."
+    )
+    if st.button("⚡ Feedback jetzt sofort erstellen"):
+        # Der Batch-Auftrag läuft serverseitig weiter, sein Ergebnis wird aber ignoriert.
+        st.session_state.pop("feedback_batch_id", None)
+        st.session_state["feedback_batch_sofort"] = True
+        st.rerun()
 
 
 def _zeige_feedback(feedback_text: str) -> None:
@@ -112,9 +214,22 @@ def _zeige_feedback(feedback_text: str) -> None:
 
     if is_offline():
         st.info("🔌 Offline-Modus: Feedback wird nicht in Supabase gespeichert.")
-    elif "feedback_row_id" not in st.session_state:
-        # Sobald das Feedback erstmals angezeigt wird, erfolgt das Persistieren.
-        speichere_gpt_feedback_in_supabase()
+    else:
+        # Supabase-Anbindung erst im Online-Zweig laden; im Offline-Modus bleibt der
+        # Import (inkl. ``supabase``-Client-Bibliothek) aus.
+        from module.gpt_feedback import (
+            feedback_speicherung_laeuft,
+            pruefe_feedback_speicherung,
+            speichere_gpt_feedback_in_supabase,
+        )
+
+        # Ein bereits beendeter Hintergrundvorgang wird ausgewertet (ID übernehmen oder
+        # Fehler anzeigen), ohne auf einen noch laufenden Vorgang zu warten.
+        pruefe_feedback_speicherung()
+        if "feedback_row_id" not in st.session_state and not feedback_speicherung_laeuft():
+            # Sobald das Feedback erstmals angezeigt wird, erfolgt das Persistieren –
+            # im Hintergrund, damit der Text ohne Wartezeit erscheint.
+            speichere_gpt_feedback_in_supabase()
 
     st.subheader("📋 Automatisches Feedback")
     st.markdown(feedback_text)
@@ -130,6 +245,9 @@ def main() -> None:
         st.session_state["student_evaluation_done"] = False
 
     feedback_text = _generiere_feedback()
+    if not feedback_text and st.session_state.get("feedback_batch_id"):
+        _batch_status_fragment()
+        st.stop()
     if not feedback_text:
         st.error("🚫 Das Abschluss-Feedback konnte nicht erstellt werden.")
         st.stop()
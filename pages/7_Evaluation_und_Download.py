@@ -5,6 +5,8 @@ können hier ihre Evaluation abgeben und – nach Abschluss – das vollständig
 herunterladen.
 """
 
+from functools import partial
+
 import streamlit as st
 
 from module.fallverwaltung import reset_fall_session_state
@@ -30,54 +32,87 @@ def _pruefe_voraussetzungen() -> None:
         )
 
 
-def _zeige_downloadbereich() -> None:
-    """Baut den bekannten Downloadbereich auf."""
+def _baue_protokoll(daten: dict) -> str:
+    """Setzt das herunterladbare Protokoll aus den übergebenen Sitzungsdaten zusammen.
 
-    st.markdown("---")
-    st.subheader("📄 Download")
+    Wird erst beim Klick auf den Download-Button aufgerufen (siehe
+    ``_zeige_downloadbereich``). ``daten`` enthält nur Referenzen auf die Werte aus
+    dem Session-State, damit die Funktion unabhängig vom Skriptlauf funktioniert.
+    """
 
-    if st.session_state.get("final_feedback") and st.session_state.get("student_evaluation_done"):
-        protokoll = ""
+    # Die Abschnitte werden in einer Liste gesammelt und einmalig verbunden. Wiederholtes
+    # ``protokoll += ...`` hätte bei langen Verläufen jedes Mal den gesamten Text kopiert.
+    teile: list[str] = [f"Simuliertes Krankheitsbild: {daten['diagnose_szenario']}\n"]
 
-        protokoll += f"Simuliertes Krankheitsbild: {st.session_state.diagnose_szenario}\n\n"
+    teile.append("---\n💬 Gesprächsverlauf (nur Fragen des Studierenden):")
+    bezeichnung_nach_rolle = {"assistant": daten["patient_name"], "user": "Du"}
+    teile.extend(
+        f"{bezeichnung_nach_rolle.get(msg['role'], 'Du')}: {msg['content']}"
+        for msg in daten["messages"][1:]
+    )
 
-        protokoll += "---\n💬 Gesprächsverlauf (nur Fragen des Studierenden):\n"
-        for msg in st.session_state.messages[1:]:
-            rolle = st.session_state.patient_name if msg["role"] == "assistant" else "Du"
-            protokoll += f"{rolle}: {msg['content']}\n"
+    abschnitte = (
+        ("koerper_befund", " Körperlicher Untersuchungsbefund:"),
+        ("user_ddx2", " Erhobene Differentialdiagnosen:"),
+        ("diagnostik_eingaben_kumuliert", " Geplante diagnostische Maßnahmen (alle Termine):"),
+        ("gpt_befunde_kumuliert", "📄 Ergebnisse der diagnostischen Maßnahmen:"),
+        ("final_diagnose", " Finale Diagnose:"),
+        ("therapie_vorschlag", " Therapiekonzept:"),
+    )
+    for schluessel, ueberschrift in abschnitte:
+        if daten.get(schluessel) is not None:
+            teile.append(f"\n---\n{ueberschrift}\n{daten[schluessel]}")
 
-        if "koerper_befund" in st.session_state:
-            protokoll += "\n---\n Körperlicher Untersuchungsbefund:\n"
-            protokoll += st.session_state.koerper_befund + "\n"
+    teile.append(f"\n---\n Strukturierte Rückmeldung:\n{daten['final_feedback']}")
+    return "\n".join(teile) + "\n"
 
-        if "user_ddx2" in st.session_state:
-            protokoll += "\n---\n Erhobene Differentialdiagnosen:\n"
-            protokoll += st.session_state.user_ddx2 + "\n"
 
-        if "diagnostik_eingaben_kumuliert" in st.session_state:
-            protokoll += "\n---\n Geplante diagnostische Maßnahmen (alle Termine):\n"
-            protokoll += st.session_state.diagnostik_eingaben_kumuliert + "\n"
+@st.fragment
+def _evaluation_fragment() -> None:
+    """Evaluationsformular als eigenes Fragment.
 
-        if "gpt_befunde_kumuliert" in st.session_state:
-            protokoll += "\n---\n📄 Ergebnisse der diagnostischen Maßnahmen:\n"
-            protokoll += st.session_state.gpt_befunde_kumuliert + "\n"
+    Jede Auswahl in den Radio-Buttons und Textfeldern löst in Streamlit einen Rerun aus.
+    Als Fragment läuft dabei nur das Formular erneut, nicht Sidebar, Downloadbereich und
+    Footer. Nach dem Speichern ruft ``student_feedback`` ``st.rerun()`` ohne
+    ``scope`` auf; die ganze Seite läuft dann neu und schaltet den Download frei.
+    """
 
-        if "final_diagnose" in st.session_state:
-            protokoll += "\n---\n Finale Diagnose:\n"
-            protokoll += st.session_state.final_diagnose + "\n"
+    student_feedback()
 
-        if "therapie_vorschlag" in st.session_state:
-            protokoll += "\n---\n Therapiekonzept:\n"
-            protokoll += st.session_state.therapie_vorschlag + "\n"
 
-        protokoll += "\n---\n Strukturierte Rückmeldung:\n"
-        protokoll += st.session_state.final_feedback + "\n"
+def _zeige_downloadbereich() -> None:
+    """Baut den bekannten Downloadbereich auf."""
+
+    st.markdown("---")
+    st.subheader("📄 Download")
+
+    if st.session_state.get("final_feedback") and st.session_state.get("student_evaluation_done"):
+        # Das Protokoll wird nicht mehr bei jedem Rerun zusammengesetzt, sondern erst,
+        # wenn tatsächlich heruntergeladen wird: ``data`` erhält eine Funktion ohne
+        # Argumente. Hier werden nur Referenzen eingesammelt, kein Text kopiert.
+        daten = {
+            schluessel: st.session_state.get(schluessel)
+            for schluessel in (
+                "diagnose_szenario",
+                "messages",
+                "patient_name",
+                "koerper_befund",
+                "user_ddx2",
+                "diagnostik_eingaben_kumuliert",
+                "gpt_befunde_kumuliert",
+                "final_diagnose",
+                "therapie_vorschlag",
+                "final_feedback",
+            )
+        }
 
         st.download_button(
             label="⬇️ Gespräch & Feedback herunterladen",
-            data=protokoll,
+            data=partial(_baue_protokoll, daten),
             file_name="karina_chatprotokoll.txt",
             mime="text/plain",
+            # Der Download selbst ändert nichts am Zustand der Seite; ein Rerun ist unnötig.
+            on_click="ignore",
         )
     else:
         st.info("💬 Der Download wird nach Abschluss der Evaluation freigeschaltet.")
@@ -132,7 +167,7 @@ def main() -> None:
 
     _pruefe_voraussetzungen()
 
-    student_feedback()
+    _evaluation_fragment()
 
     _zeige_downloadbereich()
     _zeige_neustart_button()
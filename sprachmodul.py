@@ -1,15 +1,21 @@
+import asyncio
+import json
+
 import streamlit as st
+from openai import AsyncOpenAI
+
 from module.token_counter import init_token_counters, add_usage
 from module.offline import get_offline_sprachcheck, is_offline
+from module.llm_config import BEREICH_SPRACHCHECK, get_model
+from module.openai_client import chat_completion, chat_completion_async
 
-def sprach_check(text_input, client):
-    if not text_input.strip():
-        return ""
+# Obergrenze gleichzeitiger Anfragen, damit auch größere Batches das Rate-Limit
+# des OpenAI-Kontos (RPM) nicht sprengen.
+_MAX_PARALLELE_ANFRAGEN = 10
 
-    if is_offline():
-        return get_offline_sprachcheck(text_input)
 
-    prompt = f"""
+def _baue_prompt(text_input):
+    return f"""
 Bitte überprüfe die folgenden stichpunktartigen medizinischen Fachbegriffe hinsichtlich Orthographie und Zeichensetzung, schreibe Abkürzungen aus.
 Gib den korrigierten Text direkt und ohne Vorbemerkung und ohne Kommentar zurück.
 *Stichpunkte*
@@ -28,10 +34,49 @@ Text:
 {text_input}
 """
 
+
+def _baue_batch_prompt(nummerierte_texte):
+    eingaben = "\n\n".join(f"{nummer}) {text}" for nummer, text in nummerierte_texte)
+    schluessel = ", ".join(f'"{nummer}"' for nummer, _ in nummerierte_texte)
+    return f"""
+Bitte überprüfe die folgenden nummerierten Eingaben mit stichpunktartigen medizinischen Fachbegriffen hinsichtlich Orthographie und Zeichensetzung, schreibe Abkürzungen aus.
+Korrigiere jede Eingabe für sich.
+*Stichpunkte*
+Gib stichpunktartige Begriffe bitte **mit je einem Zeilenumbruch pro Eintrag** in folgendem Format zurück:
+
+- Begriff 1  
+- Begriff 2  
+- Begriff 3
+
+⚠️ Verwende für jeden Stichpunkt eine **eigene Zeile mit einem Spiegelstrich (-)**. Niemals mehrere Begriffe in einer Zeile.
+
+*Freier Text*
+Freie Texte wie Therapiebegründungen werden als sprachlich und grammatikalisch korrigierter Fließtext zurückgegeben und **ohne Spiegelstriche**.
+
+Antworte ausschließlich mit einem JSON-Objekt ohne Vorbemerkung und ohne Kommentar. Die Schlüssel sind die Nummern der Eingaben ({schluessel}), die Werte die jeweils korrigierten Texte.
+
+Eingaben:
+{eingaben}
+"""
+
+
+def sprach_check(text_input, client):
+    # Leere Eingaben lösen keinen API-Aufruf aus; umgebende Leerzeichen und
+    # Leerzeilen werden vor dem Senden entfernt.
+    text_input = text_input.strip()
+    if not text_input:
+        return ""
+
+    if is_offline():
+        return get_offline_sprachcheck(text_input)
+
+    prompt = _baue_prompt(text_input)
+
     try:
         init_token_counters()
-        response = client.chat.completions.create(
-            model="gpt-4",
+        response = chat_completion(
+            client,
+            model=get_model(BEREICH_SPRACHCHECK),
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3
         )
@@ -47,3 +92,142 @@ Text:
     except Exception as e:
         st.error(f"Fehler bei GPT-Anfrage: {e}")
         return text_input
+
+
+async def sprach_check_async(text_input, async_client, semaphore=None):
+    """Asynchrone Variante von ``sprach_check`` für parallele Korrekturen.
+
+    Verhalten und Fehlerbehandlung entsprechen der synchronen Funktion: leere
+    Eingaben liefern ``""``, Fehler werden angezeigt und der Originaltext bleibt
+    erhalten. Die Tokenerfassung läuft im selben Thread wie das Streamlit-Skript,
+    daher ist der Zugriff auf ``st.session_state`` hier unkritisch.
+    """
+
+    # Leere Eingaben lösen keinen API-Aufruf aus; umgebende Leerzeichen und
+    # Leerzeilen werden vor dem Senden entfernt.
+    text_input = text_input.strip()
+    if not text_input:
+        return ""
+
+    if is_offline():
+        return get_offline_sprachcheck(text_input)
+
+    prompt = _baue_prompt(text_input)
+    semaphore = semaphore or asyncio.Semaphore(_MAX_PARALLELE_ANFRAGEN)
+
+    try:
+        async with semaphore:
+            response = await chat_completion_async(
+                async_client,
+                model=get_model(BEREICH_SPRACHCHECK),
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3
+            )
+        init_token_counters()
+        add_usage(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens
+        )
+        return response.choices[0].message.content.strip()
+
+    except Exception as e:
+        st.error(f"Fehler bei GPT-Anfrage: {e}")
+        return text_input
+
+
+async def _sprach_check_gather(texte, client):
+    """Startet alle Korrekturen gleichzeitig und wartet auf sämtliche Ergebnisse."""
+
+    # Der asynchrone Client wird pro Batch erzeugt und wieder geschlossen. Ein
+    # modulweiter Client wäre an die Event-Loop des ersten ``asyncio.run`` gebunden
+    # und würde beim nächsten Streamlit-Rerun mit "Event loop is closed" scheitern.
+    # Wiederholungen übernimmt wie beim synchronen Client allein ``chat_completion_async``;
+    # das Timeout wird übernommen, statt auf den SDK-Standard von 10 Minuten zu fallen.
+    semaphore = asyncio.Semaphore(_MAX_PARALLELE_ANFRAGEN)
+    async with AsyncOpenAI(
+        api_key=client.api_key,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        max_retries=0,
+    ) as async_client:
+        return await asyncio.gather(
+            *(sprach_check_async(text, async_client, semaphore) for text in texte)
+        )
+
+
+def sprach_check_parallel(texte, client):
+    """Korrigiert mehrere unabhängige Eingaben gleichzeitig.
+
+    Gibt die Ergebnisse in derselben Reihenfolge wie ``texte`` zurück. Offline
+    oder bei ausschließlich leeren Eingaben wird kein Netzwerkzugriff ausgelöst.
+    """
+
+    texte = list(texte)
+    if is_offline() or not any(text.strip() for text in texte):
+        return [sprach_check(text, client) for text in texte]
+
+    return list(asyncio.run(_sprach_check_gather(texte, client)))
+
+
+def sprach_check_batch(texte, client):
+    """Korrigiert mehrere Eingaben mit einem einzigen GPT-Aufruf.
+
+    Alle nicht-leeren Texte werden nummeriert in einen Prompt gepackt; GPT
+    antwortet im JSON-Modus mit einem Objekt ``{"1": ..., "2": ...}``. Das spart
+    gegenüber Einzelaufrufen die doppelte Prompt-Präambel und einen kompletten
+    Roundtrip. Die Ergebnisse kommen in der Reihenfolge von ``texte`` zurück;
+    leere Eingaben bleiben ``""``.
+
+    Liefert GPT kein verwertbares JSON, greift ``sprach_check_parallel`` als
+    Rückfallebene, damit die Eingaben der Studierenden nie verloren gehen.
+    """
+
+    texte = list(texte)
+    ergebnisse = ["" for _ in texte]
+    zu_pruefen = [(index, text.strip()) for index, text in enumerate(texte) if text.strip()]
+    if not zu_pruefen:
+        return ergebnisse
+
+    if is_offline():
+        for index, text in zu_pruefen:
+            ergebnisse[index] = get_offline_sprachcheck(text)
+        return ergebnisse
+
+    if len(zu_pruefen) == 1:
+        index, text = zu_pruefen[0]
+        ergebnisse[index] = sprach_check(text, client)
+        return ergebnisse
+
+    nummerierte_texte = [(str(nummer), text) for nummer, (_, text) in enumerate(zu_pruefen, start=1)]
+    prompt = _baue_batch_prompt(nummerierte_texte)
+
+    try:
+        init_token_counters()
+        response = chat_completion(
+            client,
+            model=get_model(BEREICH_SPRACHCHECK),
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )
+        add_usage(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens
+        )
+        korrekturen = json.loads(response.choices[0].message.content)
+        for nummer, (index, _) in zip((nummer for nummer, _ in nummerierte_texte), zu_pruefen):
+            korrigiert = korrekturen[nummer]
+            if not isinstance(korrigiert, str):
+                raise ValueError(f"Unerwarteter Typ für Eintrag {nummer}: {type(korrigiert).__name__}")
+            ergebnisse[index] = korrigiert.strip()
+        return ergebnisse
+
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        # Debug-Hinweis: Für die Analyse kann hier ``st.write(response.choices[0].message.content)``
+        # aktiviert werden, um die fehlerhafte JSON-Antwort anzuzeigen.
+        return sprach_check_parallel(texte, client)
+    except Exception as e:
+        st.error(f"Fehler bei GPT-Anfrage: {e}")
+        return texte
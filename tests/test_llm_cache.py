@@ -0,0 +1,45 @@
+"""Tests für den persistenten Antwort-Cache in ``module.llm_cache``."""
+
+from types import SimpleNamespace
+
+from module import llm_cache
+
+
+def _antwort(inhalt):
+    return SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=3, completion_tokens=2, total_tokens=5),
+        choices=[SimpleNamespace(message=SimpleNamespace(content=inhalt))],
+    )
+
+
+def test_cache_miss_laeuft_ueber_single_flight_und_fuellt_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("KARINA_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("KARINA_LLM_CACHE", "1")
+    monkeypatch.setattr(llm_cache, "init_token_counters", lambda: None)
+    verbrauch = []
+    monkeypatch.setattr(llm_cache, "add_usage", lambda **usage: verbrauch.append(usage))
+    aufrufe = []
+
+    def fake_chat_completion(client, **kwargs):
+        aufrufe.append(kwargs)
+        return _antwort("  Befund unauffällig.  ")
+
+    monkeypatch.setattr(llm_cache, "chat_completion", fake_chat_completion)
+
+    anfrage = dict(
+        bereich="befund",
+        model="gpt-4",
+        messages=[{"role": "user", "content": "Labor:  Hb"}],
+        temperature=0.4,
+        response_format={"type": "json_object"},
+    )
+
+    assert llm_cache.cached_chat_completion(object(), **anfrage) == "Befund unauffällig."
+    assert len(aufrufe) == 1
+    assert aufrufe[0]["response_format"] == {"type": "json_object"}
+    assert "schluessel" not in aufrufe[0]
+    assert verbrauch == [{"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}]
+
+    # Der zweite Aufruf wird aus dem Cache bedient und erreicht die API nicht mehr.
+    assert llm_cache.cached_chat_completion(object(), **anfrage) == "Befund unauffällig."
+    assert len(aufrufe) == 1